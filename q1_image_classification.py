@@ -1,186 +1,680 @@
+import time
+
+# Start of the process, used to report the startup time
+START_TIME = time.perf_counter()
+
 import tkinter as tk
 from tkinter import filedialog, Label, Button, messagebox
 from PIL import Image, ImageTk, UnidentifiedImageError
-import torch
-from torchvision import models
-from torchvision.models import ResNet18_Weights, MobileNet_V2_Weights
-from torchvision import transforms
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+import argparse
+import csv
+import functools
+import hashlib
+import io
 import json
-import urllib
+import math
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import sqlite3
+import sys
+import threading
+
+try:
+    import resource  # Peak memory readings (not available on Windows)
+except ImportError:
+    resource = None
+
+try:
+    # Optional: file system events (inotify on Linux) for the watch mode
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+# torch and torchvision are imported inside the functions that need them, so
+# the window can appear before the (slow) import has finished.
+
+# File extensions picked up when a directory is passed to the batch mode
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# Size of the image preview in the window
+PREVIEW_SIZE = (400, 300)
+
+# Shortest side the images are resized to before the 224x224 center crop
+RESIZE_SIZE = 256
+INPUT_SIZE = 224
 
+# Number of most likely classes reported for each image
+TOP_K = 5
 
-# Function to download and load ImageNet class labels from a URL
+# ImageNet labels shipped with the application: torchvision's category names
+LABELS_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "imagenet_labels.json"
+)
+PREDICTION_CACHE_FILE = os.path.join(
+    os.path.expanduser("~"), ".cache", "hit137", "predictions.sqlite3"
+)
+MODEL_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "hit137", "models")
+
+
+# Function to load ImageNet class labels, from disk when possible
 def load_imagenet_labels():
     """
-    Downloads and loads ImageNet labels for classification from a URL.
+    Loads ImageNet labels for classification. These are torchvision's category
+    names, the ones published with the model weights. They are read from the
+    bundled labels file, so torch is not needed yet; only if the file is
+    missing are they taken from torchvision's weights metadata, which holds
+    the same list.
+
     Returns:
         labels (list): A list of class labels used for classification.
     """
-    url = "https://raw.githubusercontent.com/anishathalye/imagenet-simple-labels/master/imagenet-simple-labels.json"
-    response = urllib.request.urlopen(url)
-    labels = json.loads(response.read())
-    return labels
+    if os.path.exists(LABELS_FILE):
+        with open(LABELS_FILE) as f:
+            return json.load(f)
 
+    from torchvision import models
 
-# Base class for the Tkinter window
-class BaseWindow(tk.Tk):
+    return list(models.ResNet18_Weights.IMAGENET1K_V1.meta["categories"])
+
+
+# Builders for the supported torchvision architectures
+def build_resnet18():
+    """Builds ResNet18 with ImageNet weights."""
+    from torchvision import models
+
+    return models.resnet18(weights=models.ResNet18_Weights.IMAGENET1K_V1)
+
+
+def build_mobilenet_v2():
+    """Builds MobileNetV2 with ImageNet weights."""
+    from torchvision import models
+
+    return models.mobilenet_v2(weights=models.MobileNet_V2_Weights.IMAGENET1K_V1)
+
+
+# torchvision builders of the float models, used to export frozen artifacts
+TORCHVISION_BUILDERS = {"ResNet18": build_resnet18, "MobileNet": build_mobilenet_v2}
+
+
+def frozen_model_path(architecture):
+    """Returns where the frozen TorchScript artifact of a float model is saved."""
+    return os.path.join(MODEL_CACHE_DIR, f"{architecture}_frozen.pt")
+
+
+def build_frozen(architecture, builder):
     """
-    A base class for initializing a Tkinter window.
-    Inheritance and Encapsulation principles are used.
+    Loads the frozen TorchScript artifact saved by the "export" command, which
+    skips the torchvision model construction. Falls back to builder if the
+    artifact is missing.
 
     Args:
-        title (str): The title of the window.
+        architecture (str): torchvision architecture name, e.g. "resnet18".
+        builder (callable): Builds the model with torchvision.
+
+    Returns:
+        model (torch.nn.Module): The model.
     """
+    path = frozen_model_path(architecture)
+    if os.path.exists(path):
+        import torch
 
-    def __init__(self, title="Image Classifier"):
-        super().__init__()
-        self.title(title)
-        self.geometry("800x600")
+        return torch.jit.load(path)
+    return builder()
 
 
-# Main class for Image Classification Application
-class ImageClassifierApp(BaseWindow):
+# Name of the ensemble mode and the models it combines
+ENSEMBLE = "Ensemble"
+ENSEMBLE_MODELS = ("ResNet18", "MobileNet")
+
+# Float models that have an int8 version, and their torchvision architecture
+QUANTIZABLE_MODELS = {"ResNet18": "resnet18", "MobileNet": "mobilenet_v2"}
+
+
+def quantized_model_path(architecture):
+    """Returns where the int8 model calibrated on local images is saved."""
+    return os.path.join(MODEL_CACHE_DIR, f"{architecture}_int8.pt")
+
+
+def build_quantized(architecture):
     """
-    Image Classification application using ResNet and MobileNet models.
-    Demonstrates Multiple Inheritance and Polymorphism.
+    Builds the int8 version of "resnet18" or "mobilenet_v2" for CPU inference.
+    The model calibrated on local images by the "quantize" command is used if
+    it exists, otherwise torchvision's pre-quantized weights.
 
     Args:
-        title (str): The title of the window (default is "Image Classifier").
+        architecture (str): torchvision architecture name.
+
+    Returns:
+        model (torch.nn.Module): The quantized model.
     """
+    import torch
+    from torchvision.models import quantization
 
-    def __init__(self, title="Image Classifier"):
-        super().__init__(title)
-        # Load the ImageNet class labels
-        self.imagenet_labels = load_imagenet_labels()
+    path = quantized_model_path(architecture)
+    if os.path.exists(path):
+        return torch.jit.load(path)
+    return getattr(quantization, architecture)(weights="DEFAULT", quantize=True)
 
-        # Initialize ResNet18 as the default model
-        self.model = models.resnet18(weights=ResNet18_Weights.IMAGENET1K_V1)
-        self.model.eval()  # Set model to evaluation mode (disable training)
 
-        # Call function to create and display widgets
-        self.create_widgets()
+def quantized_version(architecture):
+    """Returns the weights version of the int8 model built by build_quantized."""
+    path = quantized_model_path(architecture)
+    if os.path.exists(path):
+        return f"calibrated-{os.path.getmtime(path):.0f}"
+    return "DEFAULT"
 
-    def create_widgets(self):
+
+# Model builders keyed by display name
+MODEL_BUILDERS = {
+    "ResNet18": functools.partial(build_frozen, "resnet18", build_resnet18),
+    "MobileNet": functools.partial(build_frozen, "mobilenet_v2", build_mobilenet_v2),
+    "ResNet18 (int8)": functools.partial(build_quantized, "resnet18"),
+    "MobileNet (int8)": functools.partial(build_quantized, "mobilenet_v2"),
+}
+
+# Weights version of each model, part of the prediction cache key. A callable
+# is evaluated on every lookup, for weights that can change on disk.
+MODEL_VERSIONS = {
+    "ResNet18": "IMAGENET1K_V1",
+    "MobileNet": "IMAGENET1K_V1",
+    "ResNet18 (int8)": functools.partial(quantized_version, "resnet18"),
+    "MobileNet (int8)": functools.partial(quantized_version, "mobilenet_v2"),
+}
+
+
+def model_memory_bytes(model):
+    """
+    Estimates the memory held by a model's weights and buffers. The state dict
+    is used because quantized layers keep their weights outside parameters(),
+    and frozen TorchScript models keep them as constants in the graph.
+
+    Args:
+        model (torch.nn.Module): The model to measure.
+
+    Returns:
+        size (int): Size in bytes.
+    """
+    tensors = [t for t in model.state_dict().values() if hasattr(t, "element_size")]
+    if not tensors and hasattr(model, "graph"):
+        constants = model.graph.findAllNodes("prim::Constant")
+        tensors = [
+            node.t("value")
+            for node in constants
+            if node.output().type().kind() == "TensorType"
+        ]
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+# Registry keeping loaded models resident between switches
+class ModelRegistry:
+    """
+    Loads each registered model once and keeps it in memory, so switching back
+    to a model is instant. When more than max_models are loaded, or their total
+    size exceeds the memory budget, the least recently used one is evicted.
+    Models requested together with get_many (an ensemble's members) are never
+    evicted for each other, even if they alone exceed the limits.
+
+    Args:
+        max_models (int): Number of models kept loaded at the same time.
+        memory_budget_mb (float): Optional limit on the total size of the
+            loaded models, in megabytes.
+    """
+
+    def __init__(self, max_models=2, memory_budget_mb=None):
+        self.builders = dict(MODEL_BUILDERS)
+        self.versions = dict(MODEL_VERSIONS)
+        self.max_models = max(1, max_models)
+        self.memory_budget = memory_budget_mb and memory_budget_mb * 1024 * 1024
+        self.loaded = OrderedDict()  # name -> (model, size in bytes), oldest first
+        self.lock = threading.Lock()
+
+    def register(self, name, builder, version="1"):
         """
-        Creates and displays the widgets in the window, including buttons,
-        labels, and image preview.
+        Registers a model builder under a display name.
+
+        Args:
+            name (str): Name used to select the model.
+            builder (callable): Returns a new torch.nn.Module when called.
+            version (str): Weights version; change it when the weights change
+                so cached predictions are not reused.
         """
-        # Button to upload image
-        self.upload_button = Button(
-            self, text="Upload Image", command=self.upload_image
-        )
-        self.upload_button.pack(pady=10)
+        self.builders[name] = builder
+        self.versions[name] = version
 
-        # Label and radio buttons for model selection
-        self.model_label = Label(self, text="Select Classification Model:")
-        self.model_label.pack(pady=5)
+    def register_torchvision(self, name, architecture, weights="DEFAULT"):
+        """
+        Registers any torchvision classification architecture by its name.
 
-        self.model_selection = tk.StringVar(value="ResNet18")  # Default model selection
+        Args:
+            name (str): Name used to select the model.
+            architecture (str): torchvision model name, e.g. "resnet50".
+            weights (str): Weights to load (default is the best available).
+        """
 
-        # Radio button for ResNet18 model
-        self.resnet_button = tk.Radiobutton(
-            self,
-            text="ResNet18",
-            variable=self.model_selection,
-            value="ResNet18",
-            command=self.switch_model,
-        )
-        self.resnet_button.pack()
+        def build():
+            from torchvision import models
 
-        # Radio button for MobileNet model
-        self.mobilenet_button = tk.Radiobutton(
-            self,
-            text="MobileNet",
-            variable=self.model_selection,
-            value="MobileNet",
-            command=self.switch_model,
-        )
-        self.mobilenet_button.pack()
+            return models.get_model(architecture, weights=weights)
 
-        # Label to display the classification result
-        self.result_label = Label(
-            self, text="Classification Result: ", font=("Helvetica", 16)
-        )
-        self.result_label.pack(pady=20)
+        self.register(name, build, f"{architecture}:{weights}")
 
-        # Label to preview the uploaded image
-        self.image_label = Label(self)
-        self.image_label.pack()
+    def names(self):
+        """Returns the names of all registered models."""
+        return list(self.builders)
 
-    def switch_model(self):
+    def version(self, name):
+        """Returns the weights version of a registered model."""
+        version = self.versions.get(name, "1")
+        return version() if callable(version) else version
+
+    def get(self, name):
         """
-        Switch between ResNet18 and MobileNet models based on user selection.
-        Demonstrates Polymorphism by dynamically changing the model.
+        Returns the model with the given name, loading it on first use.
+
+        Args:
+            name (str): Registered model name.
+
+        Returns:
+            model (torch.nn.Module): The model in evaluation mode.
         """
-        selected_model = self.model_selection.get()
-        if selected_model == "ResNet18":
-            self.model = models.resnet18(weights=ResNet18_Weights.IMAGENET1K_V1)
-        elif selected_model == "MobileNet":
-            self.model = models.mobilenet_v2(weights=MobileNet_V2_Weights.IMAGENET1K_V1)
-        self.model.eval()  # Ensure the model is in evaluation mode
+        with self.lock:
+            return self._get(name, (name,))
 
-    def upload_image(self):
+    def get_many(self, names):
         """
-        Opens a file dialog to allow the user to upload an image.
-        The image is displayed and classified using the selected model.
+        Returns several models that are used together, loading the missing
+        ones. None of them is evicted to make room for another one of them.
+
+        Args:
+            names (tuple): Registered model names.
+
+        Returns:
+            models (list): The models in evaluation mode, in the same order.
         """
-        file_path = filedialog.askopenfilename(
-            filetypes=[("JPEG files", "*.jpg"), ("PNG files", "*.png")]
+        with self.lock:
+            return [self._get(name, names) for name in names]
+
+    def _get(self, name, keep):
+        """Returns a model, loading it if needed, and evicts others than keep."""
+        if name in self.loaded:
+            self.loaded.move_to_end(name)  # Mark as most recently used
+            return self.loaded[name][0]
+        if name not in self.builders:
+            raise ValueError(f"Unknown model: {name}")
+
+        model = self.builders[name]()
+        model.eval()  # Set model to evaluation mode (disable training)
+        self.loaded[name] = (model, model_memory_bytes(model))
+        self._evict(keep)
+        return model
+
+    def _evict(self, keep=()):
+        """Drops least recently used models, except keep, until the limits are met."""
+        while len(self.loaded) > self.max_models or (
+            self.memory_budget and self.memory_usage() > self.memory_budget
+        ):
+            evictable = [name for name in self.loaded if name not in keep]
+            if not evictable:
+                break
+            del self.loaded[evictable[0]]
+
+    def memory_usage(self):
+        """Returns the total size in bytes of the loaded models."""
+        return sum(size for _, size in self.loaded.values())
+
+
+# Function to hash image files for the prediction cache
+def file_digest(file_path):
+    """
+    Computes the SHA-256 digest of a file's contents.
+
+    Args:
+        file_path (str): Path of the file.
+
+    Returns:
+        digest (str): Hexadecimal digest.
+    """
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+# Persistent cache of predictions keyed by image content
+class PredictionCache:
+    """
+    Stores predictions in an SQLite database, keyed by the SHA-256 of the image
+    contents plus the model name and weights version. A known image is not
+    decoded or run through the model again, even after a restart or under a
+    different file name. When the cache is full, the least recently used
+    entries are evicted. Safe to use from several threads.
+
+    Args:
+        path (str): Database file (created if missing).
+        max_entries (int): Maximum number of predictions kept.
+    """
+
+    def __init__(self, path=PREDICTION_CACHE_FILE, max_entries=100000):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            "digest TEXT, model TEXT, version TEXT, prediction TEXT, last_used REAL, "
+            "PRIMARY KEY (digest, model, version))"
         )
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS predictions_last_used ON predictions (last_used)"
+        )
+        self.db.commit()
+        self.lock = threading.Lock()
+        self.max_entries = max_entries
+        self.entries = self.db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
 
-        # If no file is selected, show a warning message
-        if not file_path:
-            messagebox.showwarning("Warning", "No file selected!")
-            return
+    def get(self, digest, model, version):
+        """
+        Looks up a prediction and marks it as recently used.
+
+        Returns:
+            prediction (dict): The cached prediction, or None on a miss.
+        """
+        key = (digest, model, version)
+        with self.lock:
+            row = self.db.execute(
+                "SELECT prediction FROM predictions "
+                "WHERE digest = ? AND model = ? AND version = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.db.execute(
+                "UPDATE predictions SET last_used = ? "
+                "WHERE digest = ? AND model = ? AND version = ?",
+                (time.time(),) + key,
+            )
+            self.db.commit()
+            return json.loads(row[0])
+
+    def put(self, digest, model, version, prediction):
+        """
+        Stores a prediction, evicting the least recently used entries if the
+        cache is full.
+        """
+        key = (digest, model, version)
+        with self.lock:
+            # INSERT OR REPLACE reports one row even when it replaced one, so
+            # only count keys that were not stored yet.
+            known = self.db.execute(
+                "SELECT 1 FROM predictions "
+                "WHERE digest = ? AND model = ? AND version = ?",
+                key,
+            ).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)",
+                key + (json.dumps(prediction), time.time()),
+            )
+            if known is None:
+                self.entries += 1
+            if self.entries > self.max_entries:
+                self.db.execute(
+                    "DELETE FROM predictions WHERE rowid IN (SELECT rowid FROM "
+                    "predictions ORDER BY last_used LIMIT ?)",
+                    (self.entries - self.max_entries,),
+                )
+                self.entries = self.max_entries
+            self.db.commit()
+
+    def stats(self):
+        """Returns the hit/miss counters and the number of entries."""
+        return {"hits": self.hits, "misses": self.misses, "entries": self.entries}
+
+    def close(self):
+        """Closes the database."""
+        with self.lock:
+            self.db.close()
 
+
+# Optional timing and memory instrumentation of the hot paths
+class Instrumentation:
+    """
+    Records the wall time, CPU time and the process's peak resident memory so
+    far (a lifetime peak, not that of the call) for instrumented calls into a
+    ring buffer, and can wrap inference in torch.profiler to export Chrome
+    trace files (open them in chrome://tracing or Perfetto).
+    Nothing is measured unless an Instrumentation is attached to a classifier.
+    CPU time is that of the whole process, so it includes torch's compute
+    threads and any other thread busy during the call.
+
+    Args:
+        capacity (int): Number of records kept; older ones are dropped.
+        profile_dir (str): Directory for the Chrome traces of the model
+            forward passes (no profiling if None).
+    """
+
+    def __init__(self, capacity=1000, profile_dir=None):
+        self.records = deque(maxlen=capacity)
+        self.profile_dir = profile_dir
+        self.traces = 0
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    @contextmanager
+    def measure(self, name):
+        """
+        Context manager recording one call.
+
+        Args:
+            name (str): Name of the measured step, e.g. "forward".
+        """
+        wall, cpu = time.perf_counter(), time.process_time()
         try:
-            # Display the uploaded image and classify it
-            self.display_image(file_path)
-            self.classify_image(file_path)
-        except UnidentifiedImageError:
-            messagebox.showerror(
-                "Error", "Unsupported image format. Please select a valid image."
+            yield
+        finally:
+            self.records.append(
+                {
+                    "name": name,
+                    "wall_ms": 1000 * (time.perf_counter() - wall),
+                    "cpu_ms": 1000 * (time.process_time() - cpu),
+                    "peak_rss_mb": peak_rss_mb(),
+                    "time": time.time(),
+                }
             )
-        except Exception as e:
-            # Handle generic errors
-            messagebox.showerror("Error", f"Failed to process the image: {str(e)}")
 
-    def display_image(self, file_path):
+    def wrap(self, obj, method_name):
         """
-        Displays the uploaded image in the GUI window.
+        Replaces a method of an object with a measured version of itself.
 
         Args:
-            file_path (str): Path of the image to be displayed.
+            obj (object): The instance to instrument.
+            method_name (str): Name of the method, also used as record name.
         """
-        image = Image.open(file_path)
+        method = getattr(obj, method_name)
 
-        # Resize image to fit the display area (using LANCZOS for better quality)
-        image = image.resize((400, 300), Image.Resampling.LANCZOS)
-        image = ImageTk.PhotoImage(image)
+        @functools.wraps(method)
+        def measured(*args, **kwargs):
+            with self.measure(method_name):
+                return method(*args, **kwargs)
 
-        # Update the image_label widget to show the image
-        self.image_label.config(image=image)
-        self.image_label.image = image  # Keep a reference to avoid garbage collection
+        setattr(obj, method_name, measured)
 
-    def classify_image(self, file_path):
+    @contextmanager
+    def profile(self, name):
         """
-        Classifies the uploaded image using the selected AI model.
+        Context manager running torch.profiler and saving a Chrome trace,
+        when a profile directory was given.
 
         Args:
-            file_path (str): Path of the image to be classified.
+            name (str): Prefix of the trace file.
         """
-        image = Image.open(file_path)
-        transformed_image = self.transform_image(image)
+        if not self.profile_dir:
+            yield
+            return
 
-        with torch.no_grad():  # Disable gradient computation for inference
-            output = self.model(transformed_image)
+        from torch.profiler import ProfilerActivity, profile
+
+        with profile(activities=[ProfilerActivity.CPU], record_shapes=True) as prof:
+            yield
+        self.traces += 1
+        path = os.path.join(self.profile_dir, f"{name}-{self.traces:05d}.json")
+        prof.export_chrome_trace(path)
+
+    def summary(self):
+        """
+        Summarizes the records in the buffer by name.
+
+        Returns:
+            summary (dict): For each name, the number of calls, the last and
+            mean wall time, the p95 wall time, the mean CPU time and the peak
+            resident memory of the process at the last call.
+        """
+        by_name = {}
+        for record in list(self.records):
+            by_name.setdefault(record["name"], []).append(record)
+
+        summary = {}
+        for name, records in by_name.items():
+            wall = [record["wall_ms"] for record in records]
+            summary[name] = {
+                "calls": len(records),
+                "last_ms": wall[-1],
+                "mean_ms": sum(wall) / len(wall),
+                "p95_ms": percentile(wall, 95),
+                "cpu_ms": sum(record["cpu_ms"] for record in records) / len(records),
+                "peak_rss_mb": records[-1]["peak_rss_mb"],
+            }
+        return summary
+
+
+def peak_rss_mb():
+    """Returns the peak resident memory of the process in MB (None if unknown)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+# Base class holding the model and the preprocessing pipeline
+class ImageClassifier:
+    """
+    Loads the classification model and the ImageNet labels, and runs the
+    preprocessing and inference steps. It does not create any window, so it is
+    shared by the GUI and the headless batch mode.
+
+    Args:
+        model_name (str): Model to start with, "ResNet18" or "MobileNet".
+        registry (ModelRegistry): Registry to load models from (a new one
+            keeping two models resident is created by default).
+        lazy (bool): If True, nothing is loaded until load() is called.
+        cache (PredictionCache): Cache of earlier predictions (optional).
+        top_k (int): Number of most likely classes reported per image.
+    """
+
+    def __init__(
+        self, model_name="ResNet18", registry=None, lazy=False, cache=None, top_k=TOP_K
+    ):
+        self.registry = registry or ModelRegistry()
+        self.cache = cache
+        self.top_k = top_k
+        self.preprocess = None
+        self.ensemble_pool = None  # Threads running the ensemble's models
+        self.instrumentation = None
+        self.model_name = model_name
+        self.imagenet_labels = []
+        self.labels_version = ""
+        if not lazy:
+            self.load()
+
+    def load(self):
+        """
+        Loads the ImageNet class labels and the selected model. This is the
+        slow part of startup, as it imports torch and reads the weights.
+        """
+        self.imagenet_labels = load_imagenet_labels()
+        self.labels_version = hashlib.sha256(
+            json.dumps(self.imagenet_labels).encode()
+        ).hexdigest()[:12]
+
+        # Initialize the requested model (ResNet18 by default)
+        self.load_model(self.model_name)
+
+    def load_model(self, model_name):
+        """
+        Selects the model with the given name. Models already loaded by the
+        registry are reused instead of being rebuilt.
+
+        Args:
+            model_name (str): A registered model name, e.g. "ResNet18", or
+                ENSEMBLE to load all the models of the ensemble.
+        """
+        self.registry.get_many(self.member_models(model_name))
+        self.model_name = model_name
+
+    @property
+    def model(self):
+        """
+        The current model (None for the ensemble). It is looked up in the
+        registry on every use rather than kept here, so a model the registry
+        evicts is really freed and is not built a second time.
+        """
+        if self.model_name == ENSEMBLE:
+            return None
+        return self.registry.get(self.model_name)
+
+    def instrument(self, instrumentation):
+        """
+        Attaches an Instrumentation that measures the hot paths: decoding,
+        transform_image and the model forward pass (plus, in the GUI,
+        display_image and classify_image).
+
+        Args:
+            instrumentation (Instrumentation): Where the records go.
+        """
+        self.instrumentation = instrumentation
+        for method_name in self.instrumented_methods:
+            instrumentation.wrap(self, method_name)
+
+    # Methods measured by instrument(); the forward pass is measured in place
+    instrumented_methods = ("open_image", "transform_image")
+
+    def measure(self, name):
+        """Returns a context manager measuring a step, if instrumentation is on."""
+        if self.instrumentation is None:
+            return nullcontext()
+        return self.instrumentation.measure(name)
 
-        # Get the predicted class
-        _, predicted_class = output.max(1)
-        class_name = self.get_class_name(predicted_class.item())
+    def profile(self, name):
+        """Returns a context manager profiling a step, if instrumentation is on."""
+        if self.instrumentation is None:
+            return nullcontext()
+        return self.instrumentation.profile(name)
 
-        # Update the result label with the classification result
-        self.result_label.config(text=f"Classification Result: {class_name}")
+    def profiling(self):
+        """Returns whether torch.profiler traces are being saved."""
+        return bool(self.instrumentation and self.instrumentation.profile_dir)
+
+    def model_names(self):
+        """Returns the names that can be selected: the registered models and ENSEMBLE."""
+        return self.registry.names() + [ENSEMBLE]
+
+    def member_models(self, model_name):
+        """Returns the registered models used for a selectable model name."""
+        return ENSEMBLE_MODELS if model_name == ENSEMBLE else (model_name,)
 
     def transform_image(self, image):
         """
@@ -196,22 +690,34 @@ class ImageClassifierApp(BaseWindow):
         if image.mode != "RGB":
             image = image.convert("RGB")
 
-        # Define the transformation steps: resize, crop, convert to tensor, and normalize
-        preprocess = transforms.Compose(
-            [
-                transforms.Resize(256),
-                transforms.CenterCrop(224),
-                transforms.ToTensor(),
-                transforms.Normalize(
-                    mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]
-                ),
-            ]
-        )
-
         # Apply the transformations and add a batch dimension (1, C, H, W)
-        image_tensor = preprocess(image)
+        image_tensor = self.get_preprocess()(image)
         return image_tensor.unsqueeze(0)
 
+    def get_preprocess(self):
+        """
+        Returns the preprocessing pipeline, built on first use and then reused.
+
+        Returns:
+            preprocess (transforms.Compose): Resize, crop, convert to tensor
+            and normalize.
+        """
+        if self.preprocess is None:
+            from torchvision import transforms
+
+            # Define the transformation steps: resize, crop, convert to tensor, and normalize
+            self.preprocess = transforms.Compose(
+                [
+                    transforms.Resize(RESIZE_SIZE),
+                    transforms.CenterCrop(INPUT_SIZE),
+                    transforms.ToTensor(),
+                    transforms.Normalize(
+                        mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]
+                    ),
+                ]
+            )
+        return self.preprocess
+
     def get_class_name(self, class_idx):
         """
         Maps the class index to the corresponding human-readable class name.
@@ -226,8 +732,2276 @@ class ImageClassifierApp(BaseWindow):
             return self.imagenet_labels[class_idx]
         return "Unknown"
 
+    def postprocess(self, output, probabilities=False):
+        """
+        Turns a batch of model outputs into top-k predictions. Softmax and
+        top-k run as one tensor operation over the whole batch, and the
+        results are converted to Python lists once per batch.
 
-# Entry point to start the application
-if __name__ == "__main__":
-    app = ImageClassifierApp("AI-Powered Image Classifier")
-    app.mainloop()
+        Args:
+            output (torch.Tensor): Model outputs (logits) of shape (N, classes).
+            probabilities (bool): True if output is already softmax probabilities.
+
+        Returns:
+            predictions (list): One dict per image with the "class_index",
+            "label" and "confidence" of the best class, and "top_k", the
+            list of the k best classes with their confidences.
+        """
+        k = min(self.top_k, output.shape[1])
+        if not probabilities:
+            output = output.softmax(dim=1)
+        confidences, indices = output.topk(k, dim=1)
+        confidences, indices = confidences.tolist(), indices.tolist()
+
+        predictions = []
+        for row_conf, row_idx in zip(confidences, indices):
+            top_k = [
+                {
+                    "class_index": class_idx,
+                    "label": self.get_class_name(class_idx),
+                    "confidence": round(conf, 6),
+                }
+                for class_idx, conf in zip(row_idx, row_conf)
+            ]
+            predictions.append(dict(top_k[0], top_k=top_k))
+        return predictions
+
+    def open_image(self, file_path, min_size=(RESIZE_SIZE, RESIZE_SIZE)):
+        """
+        Decodes an image to RGB. JPEGs are decoded at the smallest reduced
+        scale (draft mode) that is still at least min_size.
+
+        Args:
+            file_path (str or file): Path or file object of the image.
+            min_size (tuple): Smallest (width, height) needed by the caller.
+
+        Returns:
+            image (PIL.Image): The decoded RGB image.
+        """
+        with Image.open(file_path) as image:
+            image.draft("RGB", min_size)
+            return image.convert("RGB")
+
+    def decode_image(self, file_path, preview_size=None, transform=True):
+        """
+        Decodes an image file once and produces both the model input and,
+        optionally, a preview. Large JPEGs are decoded at a reduced scale
+        (draft mode) that is still at least as big as the preview and the
+        model input need.
+
+        Args:
+            file_path (str): Path of the image.
+            preview_size (tuple): Size (width, height) of the preview, or None.
+            transform (bool): Whether to produce the model input.
+
+        Returns:
+            (PIL.Image, torch.Tensor): The preview (None if not requested) and
+            the transformed image tensor with batch dimension (None if not
+            requested).
+        """
+        width, height = preview_size or (0, 0)
+        image = self.open_image(
+            file_path, (max(width, RESIZE_SIZE), max(height, RESIZE_SIZE))
+        )
+
+        preview = None
+        if preview_size:
+            # LANCZOS for better quality; reducing_gap shrinks large images fast first
+            preview = image.resize(
+                preview_size, Image.Resampling.LANCZOS, reducing_gap=3.0
+            )
+        return preview, self.transform_image(image) if transform else None
+
+    def predict_batch(self, image_batch, model_name=None):
+        """
+        Runs the model on a batch of transformed images.
+
+        Args:
+            image_batch (torch.Tensor): Transformed images (N, C, H, W).
+            model_name (str): Registered model or ENSEMBLE (default is the
+                current one).
+
+        Returns:
+            predictions (list): Top-k predictions, see postprocess (and
+            predict_ensemble for the ensemble).
+        """
+        import torch
+
+        if (model_name or self.model_name) == ENSEMBLE:
+            return self.predict_ensemble(image_batch)
+
+        model = self.registry.get(model_name or self.model_name)
+        with torch.no_grad():  # Disable gradient computation for inference
+            with self.measure("forward"), self.profile("forward"):
+                output = model(image_batch)
+        return self.postprocess(output)
+
+    def predict_ensemble(self, image_batch, model_names=ENSEMBLE_MODELS):
+        """
+        Runs several models on the same preprocessed batch concurrently, one
+        thread per model (torch releases the GIL while computing), and
+        averages their softmax outputs. With a profile directory they run one
+        after another instead, each with its own trace.
+
+        Args:
+            image_batch (torch.Tensor): Transformed images (N, C, H, W).
+            model_names (tuple): Registered models to combine.
+
+        Returns:
+            predictions (list): Top-k predictions of the combined output, see
+            postprocess. Each also has "ms", the total time, and "models",
+            the prediction and time of every model.
+        """
+        import torch
+
+        def run(model):
+            start = time.perf_counter()
+            with torch.no_grad():  # Disable gradient computation for inference
+                probabilities = model(image_batch).softmax(dim=1)
+            return probabilities, 1000 * (time.perf_counter() - start)
+
+        if self.ensemble_pool is None:
+            self.ensemble_pool = ThreadPoolExecutor(max_workers=len(model_names))
+        start = time.perf_counter()
+        models = self.registry.get_many(model_names)
+        with self.measure("forward"):
+            if self.profiling():
+                # torch.profiler only records the thread it runs on, one session
+                # at a time, so when profiling the models run here one by one
+                outputs = []
+                for name, model in zip(model_names, models):
+                    with self.profile(f"ensemble-{name}"):
+                        outputs.append(run(model))
+            else:
+                outputs = list(self.ensemble_pool.map(run, models))
+        combined = torch.stack([probabilities for probabilities, _ in outputs]).mean(0)
+        total_ms = 1000 * (time.perf_counter() - start)
+
+        predictions = self.postprocess(combined, probabilities=True)
+        per_model = [
+            self.postprocess(probabilities, probabilities=True)
+            for probabilities, _ in outputs
+        ]
+        for i, prediction in enumerate(predictions):
+            prediction["ms"] = round(total_ms, 2)
+            prediction["models"] = {
+                name: dict(model_predictions[i], ms=round(ms, 2))
+                for name, model_predictions, (_, ms) in zip(
+                    model_names, per_model, outputs
+                )
+            }
+        return predictions
+
+    def predict(self, image_tensor, model_name=None):
+        """
+        Runs the model on a transformed image.
+
+        Args:
+            image_tensor (torch.Tensor): Transformed image with batch dimension.
+            model_name (str): Registered model to use (default is the current one).
+
+        Returns:
+            prediction (dict): Top-k prediction, see postprocess.
+        """
+        return self.predict_batch(image_tensor, model_name)[0]
+
+    def cached_prediction(self, file_path, model_name=None):
+        """
+        Looks up the prediction of an image in the cache.
+
+        Args:
+            file_path (str): Path of the image.
+            model_name (str): Registered model (default is the current one).
+
+        Returns:
+            (str, dict): The file digest (None without a cache) and the cached
+            prediction (None on a miss).
+        """
+        if not self.cache:
+            return None, None
+        model_name = model_name or self.model_name
+        digest = file_digest(file_path)
+        return digest, self.cache.get(
+            digest, model_name, self.cache_version(model_name)
+        )
+
+    def store_prediction(self, digest, prediction, model_name=None):
+        """Saves a new prediction in the cache, if there is one."""
+        if self.cache and digest:
+            model_name = model_name or self.model_name
+            self.cache.put(
+                digest, model_name, self.cache_version(model_name), prediction
+            )
+
+    def cache_version(self, model_name):
+        """
+        Returns the cache key version: weights version, number of classes and
+        a digest of the label set, since the cache stores label strings.
+        """
+        versions = "+".join(
+            self.registry.version(name) for name in self.member_models(model_name)
+        )
+        return f"{versions}/top{self.top_k}/labels-{self.labels_version}"
+
+    def classify_file(self, file_path, model_name=None):
+        """
+        Classifies a single image file. Cached predictions are returned
+        without decoding the image.
+
+        Args:
+            file_path (str): Path of the image to be classified.
+            model_name (str): Registered model to use (default is the current one).
+
+        Returns:
+            prediction (dict): "class_index" and "label" of the predicted class.
+        """
+        digest, prediction = self.cached_prediction(file_path, model_name)
+        if prediction is None:
+            _, image_tensor = self.decode_image(file_path)
+            prediction = self.predict(image_tensor, model_name)
+            self.store_prediction(digest, prediction, model_name)
+        return prediction
+
+    def preprocess_file(self, file_path):
+        """
+        Looks up, or opens and transforms, a single image file. Runs on the
+        batch worker pool.
+
+        Args:
+            file_path (str): Path of the image.
+
+        Returns:
+            item (dict): "path" and "digest", plus either the cached
+            "prediction", the (C, H, W) "tensor", or the "error" message if
+            the file could not be read.
+        """
+        item = {"path": file_path}
+        try:
+            item["digest"], prediction = self.cached_prediction(file_path)
+            if prediction is not None:
+                item["prediction"] = prediction
+            else:
+                item["tensor"] = self.decode_image(file_path)[1][0]
+        except OSError as e:  # Also covers UnidentifiedImageError
+            item["error"] = str(e)
+        return item
+
+    def classify_files(self, file_paths, batch_size=32, workers=4):
+        """
+        Classifies many image files. Images are decoded and preprocessed on a
+        thread pool while the model runs on stacked batches. At most two batches
+        are prepared ahead, so memory use does not grow with the number of files.
+        Images found in the prediction cache skip decoding and inference.
+
+        Args:
+            file_paths (list): Paths of the images to classify.
+            batch_size (int): Number of images per forward pass.
+            workers (int): Number of decode/preprocess threads.
+
+        Yields:
+            result (dict): One result per file, in input order, with "path" and
+            either the prediction fields (see postprocess) or "error".
+        """
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for start in range(0, len(file_paths), batch_size):
+                chunk = file_paths[start : start + batch_size]
+                pending.append(
+                    [pool.submit(self.preprocess_file, path) for path in chunk]
+                )
+                if len(pending) > 2:
+                    yield from self._classify_chunk(pending.popleft())
+            while pending:
+                yield from self._classify_chunk(pending.popleft())
+
+    def classify_store(self, store, batch_size=32):
+        """
+        Classifies the images of a TensorStore. No image is decoded.
+
+        Args:
+            store (TensorStore): The preprocessed images.
+            batch_size (int): Number of images per forward pass.
+
+        Yields:
+            result (dict): One result per stored image, like classify_files,
+            followed by one "error" result per image the store could not read.
+        """
+        for paths, batch in store.batches(batch_size):
+            for path, prediction in zip(paths, self.predict_batch(batch)):
+                yield {"path": path, **prediction}
+        for path, error in store.errors.items():
+            yield {"path": path, "error": error}
+
+    def _classify_chunk(self, futures):
+        """Runs one stacked forward pass over the uncached images of a chunk."""
+        import torch
+
+        items = [future.result() for future in futures]
+        todo = [item for item in items if "tensor" in item]
+        if todo:
+            batch = torch.stack([item.pop("tensor") for item in todo])
+            for item, prediction in zip(todo, self.predict_batch(batch)):
+                item["prediction"] = prediction
+                self.store_prediction(item["digest"], prediction)
+
+        results = []
+        for item in items:
+            result = {"path": item["path"]}
+            if "error" in item:
+                result["error"] = item["error"]
+            else:
+                result.update(item["prediction"])
+            results.append(result)
+        return results
+
+
+# Preprocessed images stored in one memory-mapped file
+class TensorStore:
+    """
+    Normalized 3x224x224 image tensors saved in a single .npy file, with a
+    JSON index of the image paths next to it. The file is memory-mapped, so
+    later runs feed the model straight from it without decoding any image.
+
+    Use TensorStore.build to create a store, and TensorStore(path) to open it.
+
+    Args:
+        path (str): Path of the .npy file.
+    """
+
+    def __init__(self, path):
+        import numpy as np
+
+        with open(self.index_path(path)) as f:
+            index = json.load(f)
+        self.path = path
+        self.paths = index["paths"]
+        self.errors = index["errors"]
+        # Copy-on-write mapping: pages are read from disk on demand, never written
+        self.array = np.load(path, mmap_mode="c")
+
+    @staticmethod
+    def index_path(path):
+        """Returns the path of the JSON index of a store."""
+        return os.path.splitext(path)[0] + ".json"
+
+    @classmethod
+    def build(cls, classifier, file_paths, path, workers=4):
+        """
+        Decodes and transforms images on a thread pool and writes the tensors
+        to a new store. Images that cannot be read are listed in the index.
+
+        Args:
+            classifier (ImageClassifier): Used to decode and transform the images.
+            file_paths (list): Images to store.
+            path (str): Path of the .npy file to create.
+            workers (int): Number of decode threads.
+
+        Returns:
+            store (TensorStore): The new store, opened for reading.
+        """
+        import numpy as np
+
+        def load(file_path):
+            try:
+                return classifier.decode_image(file_path)[1][0].numpy(), None
+            except OSError as e:  # Also covers UnidentifiedImageError
+                return None, str(e)
+
+        shape = (len(file_paths), 3, INPUT_SIZE, INPUT_SIZE)
+        array = np.lib.format.open_memmap(path, mode="w+", dtype="float32", shape=shape)
+        paths, errors = [], {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for file_path, (tensor, error) in zip(
+                file_paths, pool.map(load, file_paths)
+            ):
+                if error:
+                    errors[file_path] = error
+                    continue
+                array[len(paths)] = tensor
+                paths.append(file_path)
+        array.flush()
+        del array
+
+        if errors:
+            # Drop the unused rows left by unreadable images
+            array = np.load(path, mmap_mode="r")[: len(paths)]
+            np.save(path + ".tmp.npy", array)
+            del array
+            os.replace(path + ".tmp.npy", path)
+
+        with open(cls.index_path(path), "w") as f:
+            json.dump({"paths": paths, "errors": errors}, f)
+        return cls(path)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def batches(self, batch_size=32):
+        """
+        Yields the stored images in batches, without copying them.
+
+        Yields:
+            (list, torch.Tensor): The image paths and their tensors (N, C, H, W).
+        """
+        import torch
+
+        for start in range(0, len(self.paths), batch_size):
+            end = start + batch_size
+            yield self.paths[start:end], torch.from_numpy(self.array[start:end])
+
+
+# Background worker running model jobs off the Tk thread
+class InferenceWorker:
+    """
+    Runs model loading and inference jobs on a background thread so the window
+    stays responsive. Jobs are posted to a bounded queue and finished results
+    are collected with poll(), e.g. from a Tk after() callback.
+
+    A new job supersedes the older jobs of the same kind: those are skipped if
+    they have not started yet, and their results are dropped if they have.
+
+    Args:
+        max_pending (int): Maximum number of jobs waiting in the queue.
+    """
+
+    def __init__(self, max_pending=4):
+        self.jobs = queue.Queue(maxsize=max_pending)
+        self.results = queue.Queue()
+        self.latest = {}  # kind -> id of the newest job of that kind
+        self.next_id = 0
+        self.cancelled = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, kind, func, *args, on_done=None):
+        """
+        Posts a job to the worker.
+
+        Args:
+            kind (str): Job kind, e.g. "classify". Older jobs of the same kind
+                are cancelled.
+            func (callable): Function to run on the worker thread.
+            *args: Arguments for func.
+            on_done (callable): Called by poll() as on_done(result, error).
+
+        Returns:
+            job_id (int): Identifier of the new job.
+        """
+        self.next_id += 1
+        job = (self.next_id, kind, func, args, on_done)
+        self.latest[kind] = self.next_id
+        if self.jobs.full():
+            self._prune()
+        self.jobs.put(job)
+        return self.next_id
+
+    def is_current(self, job):
+        """Returns False if the job has been superseded by a newer one."""
+        job_id, kind = job[0], job[1]
+        return self.latest.get(kind) == job_id
+
+    def poll(self):
+        """
+        Returns the finished jobs that are still current.
+
+        Returns:
+            done (list): (on_done, result, error) tuples.
+        """
+        done = []
+        while True:
+            try:
+                job, result, error = self.results.get_nowait()
+            except queue.Empty:
+                return done
+            if self.is_current(job):
+                done.append((job[4], result, error))
+            else:
+                self.cancelled += 1
+
+    def stop(self):
+        """Asks the worker thread to exit once the queued jobs are done."""
+        self.jobs.put(None)
+
+    def _prune(self):
+        """Removes superseded jobs from the queue to make room for new ones."""
+        kept = []
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            if self.is_current(job):
+                kept.append(job)
+            else:
+                self.cancelled += 1
+        for job in kept:
+            self.jobs.put_nowait(job)
+
+    def _run(self):
+        """Worker thread loop."""
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            if not self.is_current(job):
+                self.cancelled += 1
+                continue
+
+            _, _, func, args, _ = job
+            try:
+                result, error = func(*args), None
+            except Exception as e:
+                result, error = None, e
+            self.results.put((job, result, error))
+
+
+# Batches concurrent requests of the HTTP service
+class MicroBatcher:
+    """
+    Collects single-image requests from many threads and runs them through the
+    model together. A batch is started when max_batch_size requests are
+    waiting, or max_wait_ms after the first one arrived, whichever is first.
+    Requests for different models in the same batch are run model by model.
+
+    Args:
+        classifier (ImageClassifier): Classifier with the labels loaded.
+        max_batch_size (int): Largest batch sent to the model.
+        max_wait_ms (float): Longest time a request waits for others.
+    """
+
+    def __init__(self, classifier, max_batch_size=16, max_wait_ms=10):
+        self.classifier = classifier
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.images = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, image_tensor, model_name):
+        """
+        Queues a transformed image and waits for its prediction.
+
+        Args:
+            image_tensor (torch.Tensor): Transformed image with batch dimension.
+            model_name (str): Registered model to use.
+
+        Returns:
+            prediction (dict): Top-k prediction, see ImageClassifier.postprocess.
+        """
+        future = Future()
+        self.requests.put((image_tensor, model_name, future))
+        return future.result()
+
+    def stats(self):
+        """Returns the number of batches and images processed."""
+        return {
+            "batches": self.batches,
+            "images": self.images,
+            "mean_batch_size": self.images / self.batches if self.batches else 0.0,
+        }
+
+    def _collect(self):
+        """Waits for a request, then gathers more until the batch is full or due."""
+        batch = [self.requests.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """Batching thread loop."""
+        import torch
+
+        while True:
+            batch = self._collect()
+            by_model = {}
+            for request in batch:
+                by_model.setdefault(request[1], []).append(request)
+
+            for model_name, requests in by_model.items():
+                try:
+                    images = torch.cat([tensor for tensor, _, _ in requests])
+                    predictions = self.classifier.predict_batch(images, model_name)
+                except Exception as e:
+                    for _, _, future in requests:
+                        future.set_exception(e)
+                    continue
+                self.batches += 1
+                self.images += len(requests)
+                for (_, _, future), prediction in zip(requests, predictions):
+                    future.set_result(prediction)
+
+
+# HTTP request handler of the local classification service
+class ClassifierRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handles the requests of the local classification service:
+
+    - POST /classify?model=ResNet18&k=5 with the image file as the body returns
+      the top-k prediction as JSON.
+    - GET /models lists the available models.
+    - GET /stats returns batching statistics.
+
+    Images are decoded on the request threads; inference goes through the
+    server's MicroBatcher.
+    """
+
+    # Largest accepted upload
+    max_upload_bytes = 32 * 1024 * 1024
+
+    def do_GET(self):
+        """Serves /models and /stats."""
+        server = self.server
+        path = urlparse(self.path).path
+        if path == "/models":
+            self.send_json(200, {"models": server.classifier.model_names()})
+        elif path == "/stats":
+            stats = server.batcher.stats()
+            if server.classifier.instrumentation:
+                stats["timings"] = server.classifier.instrumentation.summary()
+            self.send_json(200, stats)
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        """Serves /classify."""
+        server = self.server
+        url = urlparse(self.path)
+        if url.path != "/classify":
+            self.send_json(404, {"error": "Not found"})
+            return
+
+        query = parse_qs(url.query)
+        model_name = query.get("model", [server.classifier.model_name])[0]
+        if model_name not in server.classifier.model_names():
+            self.send_json(400, {"error": f"Unknown model: {model_name}"})
+            return
+        try:
+            k = int(query.get("k", [server.classifier.top_k])[0])
+        except ValueError:
+            k = 0
+        if not 1 <= k <= server.classifier.top_k:
+            self.send_json(
+                400,
+                {"error": f"k must be an integer from 1 to {server.classifier.top_k}"},
+            )
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            self.send_json(400, {"error": "Bad Content-Length"})
+            return
+        if not 0 < length <= self.max_upload_bytes:
+            self.send_json(413 if length else 400, {"error": "Bad image size"})
+            return
+
+        try:
+            _, image_tensor = server.classifier.decode_image(
+                io.BytesIO(self.rfile.read(length))
+            )
+        except OSError:  # Also covers UnidentifiedImageError
+            self.send_json(415, {"error": "Unsupported image format"})
+            return
+
+        try:
+            prediction = server.batcher.submit(image_tensor, model_name)
+        except Exception as e:
+            self.send_json(500, {"error": str(e)})
+            return
+        prediction["top_k"] = prediction["top_k"][:k]
+        self.send_json(200, dict(prediction, model=model_name))
+
+    def send_json(self, status, body):
+        """Sends a JSON response."""
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        """Logs requests to stderr only in verbose mode."""
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+# Local HTTP server sharing one set of models between tools
+class ClassifierServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server running the classification service. All clients share
+    the models loaded once by this process.
+
+    Args:
+        address (tuple): (host, port) to listen on.
+        classifier (ImageClassifier): Classifier with the labels loaded.
+        max_batch_size (int): Largest micro-batch.
+        max_wait_ms (float): Longest time a request waits for a batch to fill.
+        verbose (bool): Whether to log every request.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self, address, classifier, max_batch_size=16, max_wait_ms=10, verbose=False
+    ):
+        super().__init__(address, ClassifierRequestHandler)
+        self.classifier = classifier
+        self.batcher = MicroBatcher(classifier, max_batch_size, max_wait_ms)
+        self.verbose = verbose
+
+
+# Watches a folder and classifies images as they arrive
+class DirectoryWatcher(FileSystemEventHandler):
+    """
+    Classifies the new and changed images of a directory (recursively) as
+    they arrive. File system events are used when the optional watchdog
+    package is installed (inotify on Linux); otherwise the directory is
+    polled. A file is only classified once its modification time is settle
+    seconds old, so files still being copied are not read half-written.
+
+    Every result is appended to a JSON lines manifest together with the
+    file's size and modification time. On restart the manifest is read back,
+    and only files that are new or changed since are classified again.
+
+    Args:
+        classifier (ImageClassifier): Classifier with the labels loaded.
+        directory (str): Directory to watch.
+        manifest_path (str): JSON lines manifest of the processed files.
+        interval (float): Seconds between checks.
+        settle (float): Minimum age in seconds of a file before it is read.
+        batch_size (int): Number of images per forward pass.
+        workers (int): Number of decode threads.
+    """
+
+    def __init__(
+        self,
+        classifier,
+        directory,
+        manifest_path,
+        interval=2.0,
+        settle=1.0,
+        batch_size=32,
+        workers=4,
+    ):
+        self.classifier = classifier
+        self.directory = directory
+        self.manifest_path = manifest_path
+        self.interval = interval
+        self.settle = settle
+        self.batch_size = batch_size
+        self.workers = workers
+        self.processed = self.load_manifest()  # path -> (size, mtime)
+        self.dirty = set()  # Paths reported by file system events
+        self.lock = threading.Lock()
+        self.observer = None
+
+    def load_manifest(self):
+        """
+        Reads the manifest written by earlier runs.
+
+        Returns:
+            processed (dict): path -> (size, mtime) of the processed files.
+        """
+        processed = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Line cut short by an interrupted run
+                    processed[entry["path"]] = (entry["size"], entry["mtime"])
+        return processed
+
+    def on_any_event(self, event):
+        """watchdog callback: remembers the paths of created, changed or moved files."""
+        if event.is_directory:
+            return
+        with self.lock:
+            for path in (event.src_path, getattr(event, "dest_path", "")):
+                if path.lower().endswith(IMAGE_EXTENSIONS):
+                    self.dirty.add(path)
+
+    def candidates(self):
+        """Returns the paths to check: the reported ones, or all when polling."""
+        if self.observer is None:
+            return collect_image_paths([self.directory])
+        with self.lock:
+            paths, self.dirty = self.dirty, set()
+        return sorted(paths)
+
+    def scan(self):
+        """
+        Finds the files that are new or changed and old enough to be read.
+
+        Returns:
+            files (list): (path, size, mtime) of the files to classify.
+        """
+        now = time.time()
+        files = []
+        for path in self.candidates():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # Deleted or moved away since
+            if self.processed.get(path) == (stat.st_size, stat.st_mtime):
+                continue
+            if now - stat.st_mtime < self.settle:
+                # Check it again on the next round; polling sees it anyway
+                if self.observer is not None:
+                    with self.lock:
+                        self.dirty.add(path)
+                continue
+            files.append((path, stat.st_size, stat.st_mtime))
+        return files
+
+    def process(self, files):
+        """
+        Classifies files and appends the results to the manifest.
+
+        Args:
+            files (list): (path, size, mtime) tuples from scan().
+
+        Returns:
+            count (int): Number of files processed.
+        """
+        stats = {path: (size, mtime) for path, size, mtime in files}
+        results = self.classifier.classify_files(
+            list(stats), self.batch_size, self.workers
+        )
+        with open(self.manifest_path, "a") as manifest:
+            for result in results:
+                size, mtime = stats[result["path"]]
+                manifest.write(json.dumps(dict(result, size=size, mtime=mtime)) + "\n")
+                manifest.flush()
+                self.processed[result["path"]] = (size, mtime)
+        return len(files)
+
+    def run(self, max_rounds=None):
+        """
+        Watches the directory until interrupted.
+
+        Args:
+            max_rounds (int): Stop after this many checks (default: never).
+        """
+        if Observer is not None:
+            self.observer = Observer()
+            self.observer.schedule(self, self.directory, recursive=True)
+            self.observer.start()
+            # Catch up on what arrived while not running, then follow events
+            with self.lock:
+                self.dirty.update(collect_image_paths([self.directory]))
+
+        rounds = 0
+        try:
+            while max_rounds is None or rounds < max_rounds:
+                files = self.scan()
+                if files:
+                    count = self.process(files)
+                    print(f"Classified {count} new images", file=sys.stderr)
+                rounds += 1
+                time.sleep(self.interval)
+        finally:
+            if self.observer:
+                self.observer.stop()
+                self.observer.join()
+
+
+# Base class for the Tkinter window
+class BaseWindow(tk.Tk):
+    """
+    A base class for initializing a Tkinter window.
+    Inheritance and Encapsulation principles are used.
+
+    Args:
+        title (str): The title of the window.
+    """
+
+    def __init__(self, title="Image Classifier"):
+        super().__init__()
+        self.title(title)
+        self.geometry("800x600")
+
+
+# Main class for Image Classification Application
+class ImageClassifierApp(BaseWindow, ImageClassifier):
+    """
+    Image Classification application using ResNet and MobileNet models.
+    Demonstrates Multiple Inheritance and Polymorphism.
+
+    Args:
+        title (str): The title of the window (default is "Image Classifier").
+        registry (ModelRegistry): Registry to load models from (optional).
+        cache (PredictionCache): Cache of earlier predictions (optional).
+        instrumentation (Instrumentation): Shows live timings if given.
+    """
+
+    # Methods measured when instrumentation is on; classify_image only queues
+    # work, so the worker thread's steps are measured instead
+    instrumented_methods = ImageClassifier.instrumented_methods + (
+        "display_image",
+        "prepare_image",
+        "predict_and_store",
+    )
+
+    def __init__(
+        self, title="Image Classifier", registry=None, cache=None, instrumentation=None
+    ):
+        BaseWindow.__init__(self, title)
+        # The labels and ResNet18 (the default model) are loaded in the background
+        ImageClassifier.__init__(self, registry=registry, lazy=True, cache=cache)
+
+        # Call function to create and display widgets
+        self.create_widgets()
+
+        # Live timing readout, refreshed twice a second
+        if instrumentation:
+            self.instrument(instrumentation)
+            self.timing_label = Label(self, text="", fg="gray", justify=tk.LEFT)
+            self.timing_label.pack(side=tk.BOTTOM, pady=5)
+            self.after(500, self.update_timings)
+
+        # Background thread for model loading and inference, polled with after()
+        self.worker = InferenceWorker()
+        self.after(50, self.poll_worker)
+
+        # Show the window first, then import torch and load the model
+        self.window_time = None
+        self.set_loading(True)
+        self.after_idle(self.start_loading)
+
+    def start_loading(self):
+        """
+        Records the time until the window appeared and starts loading the
+        labels and the model on the worker thread.
+        """
+        self.window_time = time.perf_counter() - START_TIME
+        self.worker.submit("load", self.load, on_done=self.on_loaded)
+
+    def on_loaded(self, result, error):
+        """
+        Called on the Tk thread when the startup loading has finished.
+        Enables the widgets and reports the startup time.
+        """
+        if error:
+            self.status_label.config(text="Failed to load the model")
+            messagebox.showerror("Error", f"Failed to load the model: {error}")
+            return
+
+        ready_time = time.perf_counter() - START_TIME
+        report = (
+            f"Window shown in {self.window_time:.2f}s, model ready in {ready_time:.2f}s"
+        )
+        print(f"Startup: {report}", file=sys.stderr)
+        self.status_label.config(text=report)
+        self.set_loading(False)
+
+    def update_timings(self):
+        """Shows the latest timings recorded by the instrumentation."""
+        lines = [
+            f"{name}: {stats['last_ms']:.1f} ms (mean {stats['mean_ms']:.1f}, "
+            f"p95 {stats['p95_ms']:.1f}, cpu {stats['cpu_ms']:.1f}) "
+            f"x{stats['calls']}"
+            for name, stats in self.instrumentation.summary().items()
+        ]
+        rss = peak_rss_mb()
+        if rss is not None:
+            lines.append(f"process peak RSS since start: {rss:.0f} MB")
+        self.timing_label.config(text="\n".join(lines))
+        self.after(500, self.update_timings)
+
+    def poll_worker(self):
+        """
+        Passes the finished jobs of the worker thread to their callbacks.
+        Runs every 50 ms from the Tk event loop.
+        """
+        for on_done, result, error in self.worker.poll():
+            if on_done:
+                on_done(result, error)
+        self.after(50, self.poll_worker)
+
+    def set_loading(self, loading):
+        """
+        Disables the buttons and shows a message while a model is loading.
+
+        Args:
+            loading (bool): True while loading, False when done.
+        """
+        state = tk.DISABLED if loading else tk.NORMAL
+        self.upload_button.config(state=state)
+        for button in self.model_buttons.values():
+            button.config(state=state)
+        if loading:
+            self.status_label.config(text=f"Loading model {self.model_name}...")
+
+    def create_widgets(self):
+        """
+        Creates and displays the widgets in the window, including buttons,
+        labels, and image preview.
+        """
+        # Button to upload image
+        self.upload_button = Button(
+            self, text="Upload Image", command=self.upload_image
+        )
+        self.upload_button.pack(pady=10)
+
+        # Label and radio buttons for model selection
+        self.model_label = Label(self, text="Select Classification Model:")
+        self.model_label.pack(pady=5)
+
+        # Default model selection
+        self.model_selection = tk.StringVar(value=self.model_name)
+
+        # One radio button per registered model (ResNet18, MobileNet, ...)
+        # and one for the ensemble of ResNet18 and MobileNet
+        self.model_buttons = {}
+        for name in self.model_names():
+            button = tk.Radiobutton(
+                self,
+                text=name,
+                variable=self.model_selection,
+                value=name,
+                command=self.switch_model,
+            )
+            button.pack()
+            self.model_buttons[name] = button
+
+        # Label to display the classification result
+        self.result_label = Label(
+            self, text="Classification Result: ", font=("Helvetica", 16)
+        )
+        self.result_label.pack(pady=20)
+
+        # Label to display loading progress and timings
+        self.status_label = Label(self, text="", fg="gray")
+        self.status_label.pack()
+
+        # Label to preview the uploaded image
+        self.image_label = Label(self)
+        self.image_label.pack()
+
+    def switch_model(self):
+        """
+        Switch between ResNet18 and MobileNet models based on user selection.
+        Demonstrates Polymorphism by dynamically changing the model. Models
+        stay loaded in the registry, so switching back is instant. A model
+        loaded for the first time is built on the worker thread.
+        """
+        model_name = self.model_selection.get()
+        self.status_label.config(text=f"Loading model {model_name}...")
+        self.worker.submit(
+            "switch", self.load_model, model_name, on_done=self.on_model_switched
+        )
+
+    def on_model_switched(self, result, error):
+        """Reports the outcome of switch_model once the model is loaded."""
+        if error:
+            messagebox.showerror("Error", f"Failed to load the model: {error}")
+            return
+        self.status_label.config(text=f"Model {self.model_name} ready")
+
+    def upload_image(self):
+        """
+        Opens a file dialog to allow the user to upload an image.
+        The image is displayed and classified using the selected model.
+        """
+        file_path = filedialog.askopenfilename(
+            filetypes=[("JPEG files", "*.jpg"), ("PNG files", "*.png")]
+        )
+
+        # If no file is selected, show a warning message
+        if not file_path:
+            messagebox.showwarning("Warning", "No file selected!")
+            return
+
+        # Decode, display and classify the image on the worker thread
+        self.classify_image(file_path)
+
+    def show_error(self, error):
+        """
+        Shows a message box for an error raised while processing an image.
+
+        Args:
+            error (Exception): The error to report.
+        """
+        if isinstance(error, UnidentifiedImageError):
+            messagebox.showerror(
+                "Error", "Unsupported image format. Please select a valid image."
+            )
+        else:
+            # Handle generic errors
+            messagebox.showerror("Error", f"Failed to process the image: {str(error)}")
+
+    def display_image(self, image):
+        """
+        Displays the uploaded image in the GUI window.
+
+        Args:
+            image (PIL.Image): Preview of the image, already resized to fit
+                the display area.
+        """
+        image = ImageTk.PhotoImage(image)
+
+        # Update the image_label widget to show the image
+        self.image_label.config(image=image)
+        self.image_label.image = image  # Keep a reference to avoid garbage collection
+
+    def classify_image(self, file_path):
+        """
+        Classifies the uploaded image using the selected AI model. The image is
+        decoded once on the worker thread, which produces both the preview and
+        the model input. The preview is shown as soon as it is ready, then the
+        model runs, unless the prediction is already cached. A new upload
+        cancels the work still pending for an older one.
+
+        Args:
+            file_path (str): Path of the image to be classified.
+        """
+        self.result_label.config(text="Classification Result: ...")
+        self.worker.submit(
+            "image",
+            self.prepare_image,
+            file_path,
+            self.model_selection.get(),
+            on_done=self.on_decoded,
+        )
+
+    def prepare_image(self, file_path, model_name):
+        """
+        Looks up the cache and decodes the image. Runs on the worker thread.
+
+        Args:
+            file_path (str): Path of the image.
+            model_name (str): Model selected for the classification.
+
+        Returns:
+            tuple: (preview, image_tensor, digest, cached prediction or None).
+        """
+        digest, prediction = self.cached_prediction(file_path, model_name)
+        preview, image_tensor = self.decode_image(
+            file_path, PREVIEW_SIZE, transform=prediction is None
+        )
+        return preview, image_tensor, digest, prediction
+
+    def predict_and_store(self, image_tensor, digest, model_name):
+        """Runs the model and caches the prediction. Runs on the worker thread."""
+        prediction = self.predict(image_tensor, model_name)
+        self.store_prediction(digest, prediction, model_name)
+        return prediction
+
+    def on_decoded(self, result, error):
+        """
+        Shows the preview of the decoded image and starts the classification,
+        or shows the cached prediction directly.
+
+        Args:
+            result (tuple): The tuple returned by prepare_image.
+            error (Exception): The error raised while decoding, if any.
+        """
+        if error:
+            self.show_result(None, error)
+            return
+
+        preview, image_tensor, digest, prediction = result
+        self.display_image(preview)
+        if prediction is not None:
+            self.show_result(prediction, None)
+            stats = self.cache.stats()
+            self.status_label.config(
+                text=f"Cached result (cache hits {stats['hits']}, misses {stats['misses']})"
+            )
+            return
+
+        model_name = self.model_selection.get()
+        self.worker.submit(
+            "image",
+            self.predict_and_store,
+            image_tensor,
+            digest,
+            model_name,
+            on_done=self.show_result,
+        )
+
+    def show_result(self, prediction, error):
+        """
+        Updates the result label with the classification result.
+
+        Args:
+            prediction (dict): Predicted class, or None if classification failed.
+            error (Exception): The error raised by the classification, if any.
+        """
+        if error:
+            self.result_label.config(text="Classification Result: ")
+            self.show_error(error)
+            return
+        self.result_label.config(text=format_prediction(prediction))
+
+
+# Function to format a prediction for the result label
+def format_prediction(prediction, shown=3):
+    """
+    Formats the best classes of a prediction with their confidences.
+
+    Args:
+        prediction (dict): Top-k prediction, see ImageClassifier.postprocess.
+        shown (int): Number of classes shown.
+
+    Returns:
+        text (str): e.g. "Classification Result: tabby (81.2%)" followed by
+        the next most likely classes.
+    """
+    lines = [
+        f"{entry['label']} ({entry['confidence']:.1%})"
+        for entry in prediction["top_k"][:shown]
+    ]
+    text = f"Classification Result: {lines[0]}"
+    if len(lines) > 1:
+        text += "\n" + ", ".join(lines[1:])
+
+    # Ensemble: show each model's best class and time
+    for name, model_prediction in prediction.get("models", {}).items():
+        text += (
+            f"\n{name}: {model_prediction['label']} "
+            f"({model_prediction['confidence']:.1%}, {model_prediction['ms']:.0f} ms)"
+        )
+    if "ms" in prediction:
+        text += f"\nEnsemble time: {prediction['ms']:.0f} ms"
+    return text
+
+
+# Functions for the int8 quantization step
+def calibrate_quantized_model(classifier, model_name, paths, batch_size=32):
+    """
+    Quantizes a float model to int8 with static post-training quantization.
+    The model's activations are observed on the given images (calibration),
+    then its layers are converted to int8 for the current CPU backend.
+
+    Args:
+        classifier (ImageClassifier): Used to decode and transform the images.
+        model_name (str): "ResNet18" or "MobileNet".
+        paths (list): Calibration images.
+        batch_size (int): Images per calibration batch.
+
+    Returns:
+        model (torch.nn.Module): The quantized model.
+    """
+    import torch
+    from torchvision import models
+    from torchvision.models import quantization
+
+    architecture = QUANTIZABLE_MODELS[model_name]
+    float_weights = models.get_model_weights(architecture).IMAGENET1K_V1
+    model = getattr(quantization, architecture)(weights=float_weights, quantize=False)
+    model.eval()
+    model.fuse_model()  # Merge conv, batch norm and relu layers
+    backend = torch.backends.quantized.engine
+    model.qconfig = torch.ao.quantization.get_default_qconfig(backend)
+    torch.ao.quantization.prepare(model, inplace=True)
+
+    with torch.no_grad():
+        for batch in load_batches(classifier, paths, batch_size):
+            model(batch)
+    torch.ao.quantization.convert(model, inplace=True)
+    return model
+
+
+def load_batches(classifier, paths, batch_size=32):
+    """
+    Decodes images and yields them as stacked batches, skipping unreadable files.
+
+    Args:
+        classifier (ImageClassifier): Used to decode and transform the images.
+        paths (list): Image paths.
+        batch_size (int): Images per batch.
+
+    Yields:
+        batch (torch.Tensor): Batch of transformed images (N, C, H, W).
+    """
+    import torch
+
+    tensors = []
+    for path in paths:
+        try:
+            tensors.append(classifier.decode_image(path)[1][0])
+        except OSError:
+            continue
+        if len(tensors) == batch_size:
+            yield torch.stack(tensors)
+            tensors = []
+    if tensors:
+        yield torch.stack(tensors)
+
+
+def compare_models(classifier, float_model, int8_model, paths, batch_size=32):
+    """
+    Compares the predictions and speed of a float model and its int8 version.
+
+    Args:
+        classifier (ImageClassifier): Used to decode and transform the images.
+        float_model (torch.nn.Module): The reference float model.
+        int8_model (torch.nn.Module): The quantized model.
+        paths (list): Evaluation images.
+        batch_size (int): Images per batch.
+
+    Returns:
+        report (dict): Top-1 agreement, top-5 overlap, latency and size of
+        both models.
+    """
+    import torch
+
+    images = agree = overlap = 0
+    seconds = {"float": 0.0, "int8": 0.0}
+    with torch.no_grad():
+        for batch in load_batches(classifier, paths, batch_size):
+            start = time.perf_counter()
+            float_out = float_model(batch)
+            seconds["float"] += time.perf_counter() - start
+            start = time.perf_counter()
+            int8_out = int8_model(batch)
+            seconds["int8"] += time.perf_counter() - start
+
+            images += len(batch)
+            agree += (float_out.argmax(1) == int8_out.argmax(1)).sum().item()
+            float_top5 = float_out.topk(5).indices.tolist()
+            int8_top5 = int8_out.topk(5).indices.tolist()
+            for a, b in zip(float_top5, int8_top5):
+                overlap += len(set(a) & set(b)) / 5
+
+    images = max(images, 1)
+    return {
+        "images": images,
+        "top1_agreement": agree / images,
+        "top5_overlap": overlap / images,
+        "float_ms_per_image": 1000 * seconds["float"] / images,
+        "int8_ms_per_image": 1000 * seconds["int8"] / images,
+        "float_size_mb": model_memory_bytes(float_model) / 1e6,
+        "int8_size_mb": model_memory_bytes(int8_model) / 1e6,
+    }
+
+
+# Stages timed by the benchmark, in pipeline order
+STAGES = ("decode", "transform", "forward", "postprocess", "end_to_end")
+
+
+# Functions for the benchmark
+def percentile(values, pct):
+    """
+    Computes a percentile with linear interpolation between samples.
+
+    Args:
+        values (list): Samples.
+        pct (float): Percentile between 0 and 100.
+
+    Returns:
+        value (float): The percentile, or 0 if there are no samples.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples, images):
+    """
+    Summarizes the latency samples of one benchmark stage.
+
+    Args:
+        samples (list): Latencies in seconds.
+        images (int): Number of images processed in the samples.
+
+    Returns:
+        summary (dict): p50/p95/p99 and mean latency in milliseconds, and the
+        stage throughput in images per second.
+    """
+    total = sum(samples)
+    return {
+        "p50_ms": 1000 * percentile(samples, 50),
+        "p95_ms": 1000 * percentile(samples, 95),
+        "p99_ms": 1000 * percentile(samples, 99),
+        "mean_ms": 1000 * total / max(len(samples), 1),
+        "images_per_s": images / total if total else 0.0,
+    }
+
+
+def synthetic_images(count, size=(1024, 768), seed=0):
+    """
+    Creates random JPEG images in memory for benchmarking without a dataset.
+
+    Args:
+        count (int): Number of images.
+        size (tuple): Image size (width, height).
+        seed (int): Random seed, so runs are comparable.
+
+    Returns:
+        images (list): JPEG files as bytes.
+    """
+    rng = random.Random(seed)
+    images = []
+    for _ in range(count):
+        # Smooth gradients with noise compress and decode like photos, unlike pure noise
+        small = Image.frombytes(
+            "RGB", (32, 24), bytes(rng.randrange(256) for _ in range(32 * 24 * 3))
+        )
+        image = small.resize(size, Image.Resampling.BICUBIC)
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=90)
+        images.append(buffer.getvalue())
+    return images
+
+
+def run_benchmark(
+    classifier, images, model_names, batch_sizes, thread_counts, repeats=3, warmup=1
+):
+    """
+    Times the classification pipeline stage by stage: decode (Image.open),
+    transform (transform_image), model forward and postprocess (top-k and
+    label lookup), for every combination of model, batch size and number of
+    torch threads. No window is needed.
+
+    Decode and transform are timed per image, forward, postprocess and the
+    end-to-end time per batch.
+
+    Args:
+        classifier (ImageClassifier): Classifier with the labels loaded.
+        images (list): Encoded images as bytes (kept in memory, so disk reads
+            are not measured).
+        model_names (list): Registered models to benchmark.
+        batch_sizes (list): Batch sizes to benchmark.
+        thread_counts (list): Values for torch.set_num_threads.
+        repeats (int): Timed passes over the images per combination.
+        warmup (int): Untimed passes before the timed ones.
+
+    Returns:
+        report (dict): Environment details and one result per combination.
+    """
+    import torch
+
+    default_threads = torch.get_num_threads()
+    results = []
+    try:
+        for model_name in model_names:
+            model = classifier.registry.get(model_name)
+            for threads in thread_counts:
+                torch.set_num_threads(threads)
+                for batch_size in batch_sizes:
+                    samples = {stage: [] for stage in STAGES}
+                    for run in range(warmup + repeats):
+                        timed = run >= warmup
+                        for start in range(0, len(images), batch_size):
+                            chunk = images[start : start + batch_size]
+                            times = time_batch(classifier, model, chunk)
+                            if timed:
+                                for stage, values in times.items():
+                                    samples[stage].extend(values)
+
+                    counted = repeats * len(images)
+                    results.append(
+                        {
+                            "model": model_name,
+                            "batch_size": batch_size,
+                            "threads": threads,
+                            "images": counted,
+                            "stages": {
+                                stage: summarize(values, counted)
+                                for stage, values in samples.items()
+                            },
+                        }
+                    )
+    finally:
+        torch.set_num_threads(default_threads)
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+
+
+def time_batch(classifier, model, chunk):
+    """
+    Runs one batch through the pipeline and times each stage.
+
+    Returns:
+        times (dict): Latency samples in seconds for each of STAGES.
+    """
+    import torch
+
+    times = {stage: [] for stage in STAGES}
+    batch_start = time.perf_counter()
+
+    decoded = []
+    for data in chunk:
+        start = time.perf_counter()
+        decoded.append(classifier.open_image(io.BytesIO(data)))
+        times["decode"].append(time.perf_counter() - start)
+
+    tensors = []
+    for image in decoded:
+        start = time.perf_counter()
+        tensors.append(classifier.transform_image(image))
+        times["transform"].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with torch.no_grad():
+        output = model(torch.cat(tensors))
+    times["forward"].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    classifier.postprocess(output)
+    end = time.perf_counter()
+    times["postprocess"].append(end - start)
+    times["end_to_end"].append(end - batch_start)
+    return times
+
+
+def format_benchmark(report):
+    """
+    Formats a benchmark report as a table for the terminal.
+
+    Args:
+        report (dict): Report returned by run_benchmark.
+
+    Returns:
+        text (str): One line per model, batch size, thread count and stage.
+    """
+    lines = [
+        f"{'model':<18} {'batch':>5} {'thr':>3} {'stage':<12} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'img/s':>9}"
+    ]
+    for result in report["results"]:
+        for stage, summary in result["stages"].items():
+            lines.append(
+                f"{result['model']:<18} {result['batch_size']:>5} {result['threads']:>3} "
+                f"{stage:<12} {summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f} "
+                f"{summary['p99_ms']:>9.2f} {summary['images_per_s']:>9.1f}"
+            )
+    return "\n".join(lines)
+
+
+# Functions for multi-process sharded inference
+# Classifier inherited by the forked worker processes (set by classify_sharded)
+_shard_classifier = None
+
+
+def cpu_sets(processes, threads_per_process):
+    """
+    Splits the CPUs this process may run on into one set per worker process.
+    Sets wrap around when there are fewer CPUs than requested.
+
+    Args:
+        processes (int): Number of worker processes.
+        threads_per_process (int): CPUs per worker.
+
+    Returns:
+        sets (list): One list of CPU ids per worker.
+    """
+    cpus = sorted(os.sched_getaffinity(0))
+    return [
+        [
+            cpus[(k * threads_per_process + i) % len(cpus)]
+            for i in range(threads_per_process)
+        ]
+        for k in range(processes)
+    ]
+
+
+def _init_shard_worker(counter, threads, sets):
+    """
+    Sets up a worker process: torch threads, CPU pinning, and no prediction
+    cache (SQLite connections cannot be shared across fork).
+    """
+    import torch
+
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    torch.set_num_threads(threads)
+    if sets:
+        os.sched_setaffinity(0, sets[index % len(sets)])
+    _shard_classifier.cache = None
+    _shard_classifier.ensemble_pool = None  # Threads do not survive fork
+
+
+def _classify_shard(paths):
+    """Classifies one shard of paths in a worker process."""
+    return list(_shard_classifier.classify_files(paths, len(paths), workers=1))
+
+
+def classify_sharded(
+    classifier, file_paths, processes, threads_per_process=1, batch_size=32, pin=True
+):
+    """
+    Classifies images with several worker processes, each running whole
+    batches with its own number of torch threads, optionally pinned to its
+    own CPUs. The model is loaded once before the workers are forked, so they
+    share its weights copy-on-write instead of loading a copy each.
+    Batches are handed out as workers become free and the results are
+    yielded in input order.
+
+    Needs the "fork" start method (Linux); elsewhere, or with one process,
+    the images are classified in this process.
+
+    Args:
+        classifier (ImageClassifier): Classifier with the model loaded.
+        file_paths (list): Paths of the images to classify.
+        processes (int): Number of worker processes.
+        threads_per_process (int): torch.set_num_threads in each worker.
+        batch_size (int): Images per batch (one batch is one unit of work).
+        pin (bool): Pin each worker to its own CPUs (Linux only).
+
+    Yields:
+        result (dict): One result per file, in input order, like classify_files.
+    """
+    global _shard_classifier
+
+    if processes <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        yield from classifier.classify_files(file_paths, batch_size)
+        return
+
+    context = multiprocessing.get_context("fork")
+    sets = None
+    if pin and hasattr(os, "sched_setaffinity"):
+        sets = cpu_sets(processes, threads_per_process)
+    shards = [
+        file_paths[start : start + batch_size]
+        for start in range(0, len(file_paths), batch_size)
+    ]
+
+    _shard_classifier = classifier
+    counter = context.Value("i", 0)
+    with context.Pool(
+        processes, _init_shard_worker, (counter, threads_per_process, sets)
+    ) as pool:
+        for results in pool.imap(_classify_shard, shards):
+            yield from results
+    _shard_classifier = None
+
+
+# Functions for the frozen model artifacts
+def export_frozen_model(model_name):
+    """
+    Freezes a float model into a TorchScript artifact: traced, with the
+    weights folded in as constants, and running in the channels_last memory
+    layout (the input is converted inside the artifact).
+
+    Args:
+        model_name (str): "ResNet18" or "MobileNet".
+
+    Returns:
+        path (str): Where the artifact was saved.
+    """
+    import torch
+
+    class ChannelsLast(torch.nn.Module):
+        """Converts the input to channels_last before running the model."""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, x):
+            return self.model(x.contiguous(memory_format=torch.channels_last))
+
+    model = TORCHVISION_BUILDERS[model_name]().eval()
+    model = ChannelsLast(model.to(memory_format=torch.channels_last)).eval()
+    example = torch.randn(1, 3, INPUT_SIZE, INPUT_SIZE)
+    with torch.no_grad():
+        frozen = torch.jit.freeze(torch.jit.trace(model, example))
+
+    path = frozen_model_path(QUANTIZABLE_MODELS[model_name])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    torch.jit.save(frozen, path)
+    return path
+
+
+def benchmark_model_load(model_name, runs=10):
+    """
+    Compares building a model with torchvision against loading its frozen
+    artifact: load time, first inference (warm-up) and steady inference.
+
+    Args:
+        model_name (str): "ResNet18" or "MobileNet".
+        runs (int): Inferences timed after the first one.
+
+    Returns:
+        report (dict): Timings in milliseconds for "torchvision" and "frozen".
+    """
+    import torch
+
+    path = frozen_model_path(QUANTIZABLE_MODELS[model_name])
+    loaders = {
+        "torchvision": TORCHVISION_BUILDERS[model_name],
+        "frozen": lambda: torch.jit.load(path),
+    }
+    example = torch.randn(1, 3, INPUT_SIZE, INPUT_SIZE)
+    report = {}
+    for source, load in loaders.items():
+        start = time.perf_counter()
+        model = load().eval()
+        load_ms = 1000 * (time.perf_counter() - start)
+
+        times = []
+        with torch.no_grad():
+            for _ in range(runs + 1):
+                start = time.perf_counter()
+                model(example)
+                times.append(1000 * (time.perf_counter() - start))
+        report[source] = {
+            "load_ms": load_ms,
+            "first_inference_ms": times[0],
+            "steady_inference_ms": percentile(times[1:], 50),
+        }
+    return report
+
+
+# Helper functions for the headless batch mode
+def collect_image_paths(inputs):
+    """
+    Expands the given files and directories into a sorted list of image paths.
+
+    Args:
+        inputs (list): Image files and/or directories (searched recursively).
+
+    Returns:
+        paths (list): Paths of the images found.
+    """
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                for name in sorted(files):
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        paths.append(os.path.join(root, name))
+        else:
+            paths.append(item)
+    return paths
+
+
+def write_results(results, output_path):
+    """
+    Writes classification results as JSON lines, or as CSV when the output
+    path ends with ".csv". Results are written as they arrive.
+
+    Args:
+        results (iterable): Result dicts from ImageClassifier.classify_files.
+        output_path (str): Output file, or "-" for standard output.
+
+    Returns:
+        count (int): Number of results written.
+    """
+    out = open(output_path, "w", newline="") if output_path != "-" else None
+    stream = out or sys.stdout
+    count = 0
+    try:
+        if output_path.endswith(".csv"):
+            fields = ["path", "class_index", "label", "confidence", "top_k", "error"]
+            writer = csv.DictWriter(stream, fieldnames=fields, extrasaction="ignore")
+            writer.writeheader()
+            for result in results:
+                if "top_k" in result:
+                    result = dict(result, top_k=json.dumps(result["top_k"]))
+                writer.writerow(result)
+                count += 1
+        else:
+            for result in results:
+                stream.write(json.dumps(result) + "\n")
+                count += 1
+    finally:
+        if out:
+            out.close()
+    return count
+
+
+def parse_args(argv=None):
+    """
+    Parses the command line. Without a sub-command the GUI is started.
+
+    Args:
+        argv (list): Arguments to parse (default is sys.argv).
+
+    Returns:
+        args (argparse.Namespace): The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="AI-Powered Image Classifier")
+    parser.add_argument(
+        "--max-models", type=int, default=2, help="Models kept loaded at once"
+    )
+    parser.add_argument(
+        "--memory-budget-mb", type=float, help="Size limit for the loaded models"
+    )
+    parser.add_argument(
+        "--cache", default=PREDICTION_CACHE_FILE, help="Prediction cache database"
+    )
+    parser.add_argument(
+        "--cache-size", type=int, default=100000, help="Predictions kept in the cache"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Do not use the prediction cache"
+    )
+    parser.add_argument(
+        "--instrument", action="store_true", help="Measure and report hot-path timings"
+    )
+    parser.add_argument(
+        "--profile-dir", help="Save torch.profiler Chrome traces of inference here"
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch_parser = subparsers.add_parser(
+        "batch", help="Classify images without opening a window"
+    )
+    batch_parser.add_argument(
+        "inputs", nargs="*", help="Image files and/or directories to classify"
+    )
+    batch_parser.add_argument(
+        "--store", help="Classify the images of a store made by 'preprocess'"
+    )
+    batch_parser.add_argument(
+        "-o",
+        "--output",
+        default="-",
+        help="Output file (.jsonl or .csv, default stdout)",
+    )
+    batch_parser.add_argument(
+        "-m", "--model", default="ResNet18", choices=list(MODEL_BUILDERS) + [ENSEMBLE]
+    )
+    batch_parser.add_argument("--batch-size", type=int, default=32)
+    batch_parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Worker processes sharing the model (Linux, no prediction cache)",
+    )
+    batch_parser.add_argument(
+        "--threads-per-process", type=int, default=1, help="torch threads per worker"
+    )
+    batch_parser.add_argument(
+        "--no-pin", action="store_true", help="Do not pin workers to CPUs"
+    )
+    batch_parser.add_argument(
+        "--top-k", type=int, default=TOP_K, help="Classes reported per image"
+    )
+    batch_parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="Decode threads"
+    )
+
+    watch_parser = subparsers.add_parser(
+        "watch", help="Classify new images as they arrive in a directory"
+    )
+    watch_parser.add_argument("directory", help="Directory to watch")
+    watch_parser.add_argument(
+        "--manifest",
+        default="classified.jsonl",
+        help="Results and list of processed files (JSON lines, appended)",
+    )
+    watch_parser.add_argument(
+        "-m", "--model", default="ResNet18", choices=list(MODEL_BUILDERS) + [ENSEMBLE]
+    )
+    watch_parser.add_argument(
+        "--interval", type=float, default=2.0, help="Seconds between checks"
+    )
+    watch_parser.add_argument(
+        "--settle", type=float, default=1.0, help="Minimum file age before reading"
+    )
+    watch_parser.add_argument("--batch-size", type=int, default=32)
+    watch_parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="Decode threads"
+    )
+
+    preprocess_parser = subparsers.add_parser(
+        "preprocess", help="Save preprocessed tensors to a memory-mapped store"
+    )
+    preprocess_parser.add_argument(
+        "inputs", nargs="+", help="Image files and/or directories"
+    )
+    preprocess_parser.add_argument(
+        "-o", "--output", required=True, help="Store file to create (.npy)"
+    )
+    preprocess_parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="Decode threads"
+    )
+
+    export_parser = subparsers.add_parser(
+        "export", help="Save frozen TorchScript models for faster loading"
+    )
+    export_parser.add_argument(
+        "-m",
+        "--models",
+        nargs="+",
+        default=list(TORCHVISION_BUILDERS),
+        choices=list(TORCHVISION_BUILDERS),
+    )
+    export_parser.add_argument(
+        "--runs", type=int, default=10, help="Inferences timed in the comparison"
+    )
+
+    quantize_parser = subparsers.add_parser(
+        "quantize", help="Calibrate an int8 model on local images"
+    )
+    quantize_parser.add_argument(
+        "inputs", nargs="+", help="Calibration image files and/or directories"
+    )
+    quantize_parser.add_argument(
+        "-m", "--model", default="ResNet18", choices=list(QUANTIZABLE_MODELS)
+    )
+    quantize_parser.add_argument(
+        "--eval", nargs="+", help="Images to compare the models on (default: inputs)"
+    )
+    quantize_parser.add_argument(
+        "--max-images", type=int, default=256, help="Calibration images used"
+    )
+    quantize_parser.add_argument("--batch-size", type=int, default=32)
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="Run a local HTTP classification service"
+    )
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8137)
+    serve_parser.add_argument(
+        "-m",
+        "--models",
+        nargs="+",
+        default=["ResNet18"],
+        choices=list(MODEL_BUILDERS) + [ENSEMBLE],
+        help="Models loaded at startup (the first is the default)",
+    )
+    serve_parser.add_argument(
+        "--top-k", type=int, default=TOP_K, help="Most classes a request can ask for"
+    )
+    serve_parser.add_argument("--max-batch-size", type=int, default=16)
+    serve_parser.add_argument(
+        "--max-wait-ms", type=float, default=10, help="Time a request waits for a batch"
+    )
+    serve_parser.add_argument("-v", "--verbose", action="store_true")
+
+    bench_parser = subparsers.add_parser(
+        "bench", help="Benchmark the pipeline stage by stage"
+    )
+    bench_parser.add_argument(
+        "inputs", nargs="*", help="Images to use (default: synthetic images)"
+    )
+    bench_parser.add_argument(
+        "-m",
+        "--models",
+        nargs="+",
+        default=["ResNet18", "MobileNet"],
+        choices=list(MODEL_BUILDERS),
+    )
+    bench_parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8, 32])
+    bench_parser.add_argument(
+        "--threads",
+        nargs="+",
+        type=int,
+        default=[os.cpu_count() or 1],
+        help="torch thread counts to try",
+    )
+    bench_parser.add_argument(
+        "--images", type=int, default=64, help="Number of images (synthetic or local)"
+    )
+    bench_parser.add_argument("--repeats", type=int, default=3)
+    bench_parser.add_argument("--warmup", type=int, default=1)
+    bench_parser.add_argument("-o", "--output", help="Write the JSON report here")
+    return parser.parse_args(argv)
+
+
+def create_registry(args):
+    """
+    Creates the model registry configured by the parsed arguments.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+
+    Returns:
+        registry (ModelRegistry): The new registry.
+    """
+    return ModelRegistry(args.max_models, args.memory_budget_mb)
+
+
+def create_cache(args):
+    """
+    Opens the prediction cache configured by the parsed arguments.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+
+    Returns:
+        cache (PredictionCache): The cache, or None if it is disabled.
+    """
+    if args.no_cache:
+        return None
+    return PredictionCache(args.cache, args.cache_size)
+
+
+def create_instrumentation(args):
+    """
+    Creates the instrumentation requested by the parsed arguments.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+
+    Returns:
+        instrumentation (Instrumentation): None unless --instrument or
+        --profile-dir was given.
+    """
+    if not (args.instrument or args.profile_dir):
+        return None
+    return Instrumentation(profile_dir=args.profile_dir)
+
+
+def print_instrumentation(instrumentation):
+    """Prints the instrumentation summary to stderr, if there is one."""
+    if instrumentation:
+        for name, stats in instrumentation.summary().items():
+            print(f"{name}: {json.dumps(stats)}", file=sys.stderr)
+
+
+def run_batch(args):
+    """
+    Runs the headless batch classification described by the parsed arguments.
+
+    Args:
+        args (argparse.Namespace): Arguments of the "batch" sub-command.
+    """
+    cache = create_cache(args)
+    classifier = ImageClassifier(
+        args.model, create_registry(args), cache=cache, top_k=args.top_k
+    )
+    instrumentation = create_instrumentation(args)
+    if instrumentation:
+        classifier.instrument(instrumentation)
+    if args.store:
+        results = classifier.classify_store(TensorStore(args.store), args.batch_size)
+    elif args.inputs and args.processes > 1:
+        paths = collect_image_paths(args.inputs)
+        results = classify_sharded(
+            classifier,
+            paths,
+            args.processes,
+            args.threads_per_process,
+            args.batch_size,
+            not args.no_pin,
+        )
+    elif args.inputs:
+        paths = collect_image_paths(args.inputs)
+        results = classifier.classify_files(paths, args.batch_size, args.workers)
+    else:
+        sys.exit("Nothing to classify: give image paths or --store")
+    count = write_results(results, args.output)
+    print(f"Classified {count} images with {args.model}", file=sys.stderr)
+    if cache:
+        print(f"Prediction cache: {cache.stats()}", file=sys.stderr)
+        cache.close()
+    print_instrumentation(instrumentation)
+
+
+def run_watch(args):
+    """
+    Watches a directory and classifies new images until interrupted.
+
+    Args:
+        args (argparse.Namespace): Arguments of the "watch" sub-command.
+    """
+    classifier = ImageClassifier(
+        args.model, create_registry(args), cache=create_cache(args)
+    )
+    watcher = DirectoryWatcher(
+        classifier,
+        args.directory,
+        args.manifest,
+        args.interval,
+        args.settle,
+        args.batch_size,
+        args.workers,
+    )
+    mode = "file system events" if Observer else "polling"
+    print(
+        f"Watching {args.directory} ({mode}), {len(watcher.processed)} files done",
+        file=sys.stderr,
+    )
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+
+
+def run_preprocess(args):
+    """
+    Builds a TensorStore from the given images.
+
+    Args:
+        args (argparse.Namespace): Arguments of the "preprocess" sub-command.
+    """
+    classifier = ImageClassifier(lazy=True)
+    paths = collect_image_paths(args.inputs)
+    store = TensorStore.build(classifier, paths, args.output, args.workers)
+    print(
+        f"Stored {len(store)} images in {args.output} ({len(store.errors)} unreadable)",
+        file=sys.stderr,
+    )
+
+
+def run_export(args):
+    """
+    Exports the frozen artifacts and prints how much faster they load.
+
+    Args:
+        args (argparse.Namespace): Arguments of the "export" sub-command.
+    """
+    report = {}
+    for model_name in args.models:
+        path = export_frozen_model(model_name)
+        report[model_name] = dict(
+            benchmark_model_load(model_name, args.runs), path=path
+        )
+    print(json.dumps(report, indent=2))
+
+
+def run_quantize(args):
+    """
+    Calibrates an int8 model, saves it where the "(int8)" models are loaded
+    from, and prints how closely it agrees with the float model.
+
+    Args:
+        args (argparse.Namespace): Arguments of the "quantize" sub-command.
+    """
+    import torch
+
+    classifier = ImageClassifier(args.model, create_registry(args))
+    paths = collect_image_paths(args.inputs)
+    eval_paths = collect_image_paths(args.eval) if args.eval else paths
+    if not paths:
+        sys.exit("No calibration images found")
+
+    int8_model = calibrate_quantized_model(
+        classifier, args.model, paths[: args.max_images], args.batch_size
+    )
+    report = compare_models(
+        classifier, classifier.model, int8_model, eval_paths, args.batch_size
+    )
+
+    # Save as TorchScript so it loads without rebuilding the quantized layers
+    architecture = QUANTIZABLE_MODELS[args.model]
+    path = quantized_model_path(architecture)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    example = next(load_batches(classifier, paths[:1]))
+    torch.jit.save(torch.jit.trace(int8_model, example), path)
+
+    report["saved_to"] = path
+    print(json.dumps(report, indent=2))
+
+
+def run_serve(args):
+    """
+    Loads the models and runs the HTTP service until interrupted.
+
+    Args:
+        args (argparse.Namespace): Arguments of the "serve" sub-command.
+    """
+    registry = create_registry(args)
+    classifier = ImageClassifier(args.models[0], registry, lazy=True, top_k=args.top_k)
+    # Every model a request can select stays loaded, ensemble members included
+    served = list(
+        dict.fromkeys(
+            name
+            for model_name in args.models
+            for name in classifier.member_models(model_name)
+        )
+    )
+    registry.max_models = max(registry.max_models, len(served))
+    instrumentation = create_instrumentation(args)
+    if instrumentation:
+        classifier.instrument(instrumentation)
+    classifier.load()
+    registry.get_many(served)  # Load now rather than on the first request
+    if registry.memory_budget and registry.memory_usage() > registry.memory_budget:
+        sys.exit(
+            f"--memory-budget-mb is too small to keep {', '.join(served)} loaded "
+            f"(they need {registry.memory_usage() / 2**20:.0f} MB)"
+        )
+
+    server = ClassifierServer(
+        (args.host, args.port),
+        classifier,
+        args.max_batch_size,
+        args.max_wait_ms,
+        args.verbose,
+    )
+    print(f"Serving on http://{args.host}:{args.port}/classify", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def run_bench(args):
+    """
+    Runs the benchmark, prints a table and optionally saves the JSON report.
+
+    Args:
+        args (argparse.Namespace): Arguments of the "bench" sub-command.
+    """
+    classifier = ImageClassifier(args.models[0], create_registry(args))
+    if args.inputs:
+        images = []
+        for path in collect_image_paths(args.inputs)[: args.images]:
+            with open(path, "rb") as f:
+                images.append(f.read())
+    else:
+        images = synthetic_images(args.images)
+
+    report = run_benchmark(
+        classifier,
+        images,
+        args.models,
+        args.batch_sizes,
+        args.threads,
+        args.repeats,
+        args.warmup,
+    )
+    print(format_benchmark(report))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+# Entry point to start the application
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "batch":
+        run_batch(args)
+    elif args.command == "watch":
+        run_watch(args)
+    elif args.command == "preprocess":
+        run_preprocess(args)
+    elif args.command == "export":
+        run_export(args)
+    elif args.command == "quantize":
+        run_quantize(args)
+    elif args.command == "serve":
+        run_serve(args)
+    elif args.command == "bench":
+        run_bench(args)
+    else:
+        app = ImageClassifierApp(
+            "AI-Powered Image Classifier",
+            create_registry(args),
+            create_cache(args),
+            create_instrumentation(args),
+        )
+        app.mainloop()
@@ -1,5 +1,16 @@
-import pygame
+import argparse
+import atexit
+import csv
+import gc
+import math
+import os
 import random
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict, deque
+
+import pygame
 
 # Constants
 SCREEN_WIDTH, SCREEN_HEIGHT = 1000, 600
@@ -13,6 +24,10 @@ PROJECTILE_SIZE = (50, 50)
 COLLECTIBLE_SIZE = (50, 50)
 BOSS_SIZE = (150, 150)
 FPS = 60
+STEP_MS = 1000 / FPS  # Simulation step
+MAX_FRAME_MS = 250  # Longer frames are not caught up, the game slows down instead
+LEVEL_COMPLETE_MS = 2000
+SOAK_MAX_GROWTH = 256  # Bytes per game
 JUMP_SPEED = 10
 GRAVITY = 0.5
 PLAYER_HEALTH = 100
@@ -25,54 +40,528 @@ BOSS_SHOOT_PROBABILITY = 0.02
 ENEMY_SPAWN_INTERVAL = 2000
 MAX_ENEMIES = 10
 LEVEL_SCORES = {1: 10, 2: 20, 3: 30}
-
-# Initialize Pygame
-pygame.init()
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Shooting Game")
-clock = pygame.time.Clock()
-font = pygame.font.Font(None, 36)
-
-# Load Images and Pre-scale
-background_image = pygame.image.load("./img/background.jpg")
-player_image = pygame.transform.scale(
-    pygame.image.load("./img/player.gif"), PLAYER_SIZE
-)
-enemy_image = pygame.transform.scale(pygame.image.load("./img/enemy.png"), ENEMY_SIZE)
-projectile_image = pygame.transform.scale(
-    pygame.image.load("./img/bullet.png"), PROJECTILE_SIZE
-)
-boss_image = pygame.transform.scale(pygame.image.load("./img/boss.png"), BOSS_SIZE)
-boss_image = pygame.transform.flip(boss_image, True, False)
-boss_projectile_image = pygame.transform.scale(
-    pygame.image.load("./img/boss_shot.png"), PROJECTILE_SIZE
-)
-
-# Load collectible images
-ammo_image = pygame.transform.scale(
-    pygame.image.load("./img/ammo_box.png"), COLLECTIBLE_SIZE
-)
-health_image = pygame.transform.scale(
-    pygame.image.load("./img/health_box.png"), COLLECTIBLE_SIZE
-)
-coin_image = pygame.transform.scale(
-    pygame.image.load("./img/coin.png"), COLLECTIBLE_SIZE
-)
+GRID_CELL_SIZE = 128
+PROJECTILE_POOL_SIZE = 64
+BOSS_PROJECTILE_POOL_SIZE = 32
+COLLECTIBLE_POOL_SIZE = 16
+IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "img")
+# Image name: (file, size or None to keep it, flipped horizontally)
+IMAGES = {
+    "background": ("background.jpg", None, False),
+    "player": ("player.gif", PLAYER_SIZE, False),
+    "enemy": ("enemy.png", ENEMY_SIZE, False),
+    "projectile": ("bullet.png", PROJECTILE_SIZE, False),
+    "boss": ("boss.png", BOSS_SIZE, True),
+    "boss_projectile": ("boss_shot.png", PROJECTILE_SIZE, False),
+    "ammo": ("ammo_box.png", COLLECTIBLE_SIZE, False),
+    "health": ("health_box.png", COLLECTIBLE_SIZE, False),
+    "coin": ("coin.png", COLLECTIBLE_SIZE, False),
+}
+PROFILE_HISTORY = 240
+PHASE_COLORS = {
+    "events": (200, 200, 200),
+    "update": (0, 160, 255),
+    "spawn": (160, 0, 255),
+    "collisions": (255, 80, 0),
+    "draw": (0, 200, 120),
+    "boss": (255, 0, 160),
+    "hud": (255, 220, 0),
+    "overlay": (120, 120, 120),
+    "flip": (0, 255, 255),
+}
+
+
+# Initialize Pygame, the window and the images
+def init_game(headless=False):
+    """
+    Initializes Pygame and opens the window. In headless mode SDL's dummy video
+    driver is used, so no display is needed. Images are loaded by the
+    AssetManager when first used.
+    """
+    global screen, font
+
+    if headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Shooting Game")
+    font = pygame.font.Font(None, 36)
+
+
+# Asset Manager Class
+class AssetManager:
+    """
+    Loads, converts and scales each image once, on first use, and computes one
+    mask per image. Sprites share these surfaces and masks, so creating one does
+    no pixel work and every blit uses the display's pixel format.
+    """
+
+    def __init__(self, directory, images):
+        self.directory = directory
+        self.images = images
+        self.surfaces = {}
+        self.masks = {}
+
+    def image(self, name):
+        """Returns the shared surface of an image."""
+        if name not in self.surfaces:
+            file_name, size, flipped = self.images[name]
+            surface = pygame.image.load(os.path.join(self.directory, file_name))
+            # JPEGs have no transparency, so they can use the faster convert()
+            if file_name.endswith(".jpg"):
+                surface = surface.convert()
+            else:
+                surface = surface.convert_alpha()
+            if size:
+                surface = pygame.transform.scale(surface, size)
+            if flipped:
+                surface = pygame.transform.flip(surface, True, False)
+            self.surfaces[name] = surface
+        return self.surfaces[name]
+
+    def mask(self, name):
+        """Returns the shared mask of an image, for pixel-perfect collisions."""
+        if name not in self.masks:
+            self.masks[name] = pygame.mask.from_surface(self.image(name))
+        return self.masks[name]
+
+
+assets = AssetManager(IMAGE_DIR, IMAGES)
+
+
+# Spatial Hash Class
+class SpatialHash:
+    """
+    Uniform grid broadphase for the collision passes. Sprites are bucketed by
+    the cells their rect touches, so a query only runs the mask test against
+    sprites in the same cells instead of against a whole group.
+    """
+
+    def __init__(self, cell_size=GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def cells_of(self, rect):
+        """Yields the cells a rect touches."""
+        size = self.cell_size
+        for cell_x in range(rect.left // size, (rect.right - 1) // size + 1):
+            for cell_y in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                yield cell_x, cell_y
+
+    def insert(self, sprite):
+        """Adds a sprite at its current position."""
+        for cell in self.cells_of(sprite.rect):
+            self.cells.setdefault(cell, []).append(sprite)
+
+    def rebuild(self, *groups):
+        """Empties the grid and adds the sprites of the groups, once per frame."""
+        self.cells.clear()
+        for group in groups:
+            for sprite in group:
+                self.insert(sprite)
+
+    def collide(self, sprite, group, dokill=False):
+        """
+        Returns the sprites of group whose masks overlap sprite's mask, like
+        pygame.sprite.spritecollide with collide_mask. Sprites removed from the
+        group since the rebuild are skipped.
+        """
+        hits = []
+        seen = set()
+        for cell in self.cells_of(sprite.rect):
+            for other in self.cells.get(cell, ()):
+                if other in seen or not group.has_internal(other):
+                    continue
+                seen.add(other)
+                if sprite.rect.colliderect(other.rect) and pygame.sprite.collide_mask(
+                    sprite, other
+                ):
+                    hits.append(other)
+        if dokill:
+            for other in hits:
+                other.kill()
+        return hits
+
+
+# Renderer Class
+class Renderer:
+    """
+    Draws the game frames and pushes them to the display. By default every
+    frame blits the whole background and flips the display. In dirty-rect mode
+    only the background under last frame's sprites and HUD is restored, and
+    only the regions drawn in the last two frames are sent to the display.
+    """
+
+    def __init__(self, dirty_rects=False):
+        self.dirty_rects = dirty_rects
+        self.full_redraw = True
+        self.sprite_rects = []
+        self.overlay_rects = []
+        self.previous_overlay_rects = []
+        self.pixels = 0
+        self.total_pixels = 0
+        self.frames = 0
+
+    def reset(self):
+        """Redraws the whole screen next frame, e.g. after a menu covered it."""
+        self.full_redraw = True
+
+    def draw_sprites(self, sprites):
+        """Restores the background and draws the sprites (a RenderUpdates group)."""
+        background = assets.image("background")
+        if self.dirty_rects and not self.full_redraw:
+            sprites.clear(screen, background)
+            for rect in self.overlay_rects:
+                screen.blit(background, rect, rect)
+        else:
+            screen.blit(background, (0, 0))
+        self.sprite_rects = sprites.draw(screen)
+        self.previous_overlay_rects = self.overlay_rects
+        self.overlay_rects = []
+
+    def add(self, *rects):
+        """Registers rects drawn over the sprites (HUD, health bars, overlays)."""
+        self.overlay_rects.extend(rects)
+
+    def present(self):
+        """Sends the frame to the display and counts the pixels pushed."""
+        screen_rect = screen.get_rect()
+        if self.dirty_rects and not self.full_redraw:
+            rects = [
+                rect.clip(screen_rect)
+                for rect in self.sprite_rects
+                + self.previous_overlay_rects
+                + self.overlay_rects
+            ]
+            pygame.display.update(rects)
+            self.pixels = sum(rect.width * rect.height for rect in rects)
+        else:
+            pygame.display.flip()
+            self.pixels = screen_rect.width * screen_rect.height
+        self.full_redraw = False
+        self.total_pixels += self.pixels
+        self.frames += 1
+
+
+renderer = Renderer()
+
+
+# Game clock, real or simulated
+class GameClock:
+    """
+    Paces the game loop and measures how long each frame took. In headless mode
+    nothing waits: every frame reports frame_ms (one simulation step unless
+    given), so the loop runs as fast as the CPU allows and the run does not
+    depend on the machine's speed.
+    """
+
+    def __init__(self, headless=False, frame_ms=None):
+        self.headless = headless
+        self.frame_ms = frame_ms
+        self.clock = pygame.time.Clock()
+
+    def tick(self, fps):
+        """Waits for the next frame and returns the milliseconds since the last."""
+        if self.headless:
+            return self.frame_ms or 1000 / fps
+        return self.clock.tick(fps)
+
+
+# Frame Profiler Class
+class FrameProfiler:
+    """
+    Times each phase of the game loop (excluding the wait for the next frame).
+    When started it shows a rolling graph with frame time percentiles and
+    entity counts, toggled with F3, and writes one CSV row per frame.
+    """
+
+    def __init__(self, history=PROFILE_HISTORY):
+        self.enabled = False
+        self.visible = False
+        self.history = deque(maxlen=history)
+        self.frame_times = []
+        self.phase_totals = dict.fromkeys(PHASE_COLORS, 0.0)
+        self.phase_max = dict.fromkeys(PHASE_COLORS, 0.0)
+        self.phases = None
+        self.counts = {}
+        self.pools = {}
+        self.last = 0
+        self.file = None
+        self.writer = None
+        self.graph = None
+        self.font = None
+        self.legend = None
+
+    def start(self, csv_path, pools=None):
+        """
+        Enables profiling and opens the CSV trace, which is closed on exit. The
+        statistics of the sprite pools, {name: SpritePool}, are recorded too.
+        """
+        self.pools = pools or {}
+        self.enabled = True
+        self.visible = True
+        self.file = open(csv_path, "w", newline="")
+        self.writer = None
+        atexit.register(self.close)
+
+    def begin_frame(self):
+        """Starts timing a frame."""
+        if self.enabled:
+            self.phases = dict.fromkeys(PHASE_COLORS, 0.0)
+            self.last = time.perf_counter()
+
+    def lap(self, phase):
+        """Adds the time since the previous lap to a phase of this frame."""
+        if self.enabled:
+            now = time.perf_counter()
+            self.phases[phase] += 1000 * (now - self.last)
+            self.last = now
+
+    def end_frame(self, counts):
+        """Records the frame with the entity counts, e.g. {"enemies": 5}."""
+        if not self.enabled:
+            return
+        total = sum(self.phases.values())
+        self.history.append(total)
+        self.frame_times.append(total)
+        for phase, ms in self.phases.items():
+            self.phase_totals[phase] += ms
+            self.phase_max[phase] = max(self.phase_max[phase], ms)
+        self.counts = counts
+        pool_stats = {
+            f"{name}_pool_{key}": value
+            for name, pool in self.pools.items()
+            for key, value in pool.stats().items()
+        }
+
+        if self.writer is None:
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(
+                ["frame", *self.phases, "total_ms", *counts, *pool_stats]
+            )
+        self.writer.writerow(
+            [len(self.frame_times)]
+            + [f"{ms:.3f}" for ms in self.phases.values()]
+            + [f"{total:.3f}", *counts.values(), *pool_stats.values()]
+        )
+        self.add_to_graph()
+
+    def add_to_graph(self):
+        """Scrolls the graph by one pixel and draws the frame as a stacked bar."""
+        if self.graph is None:
+            self.graph = pygame.Surface((self.history.maxlen, 64))
+        width, height = self.graph.get_size()
+        self.graph.scroll(-1, 0)
+        self.graph.fill(BLACK, (width - 1, 0, 1, height))
+        bottom = height
+        for phase, ms in self.phases.items():
+            top = max(0, bottom - ms * 3)  # 3 pixels per millisecond
+            if bottom - top >= 1:
+                pygame.draw.line(
+                    self.graph,
+                    PHASE_COLORS[phase],
+                    (width - 1, top),
+                    (width - 1, bottom - 1),
+                )
+            bottom = top
+        budget = height - 3000 / FPS
+        self.graph.set_at((width - 1, int(budget)), WHITE)
+
+    def draw(self, surface, x=10, y=30):
+        """
+        Draws the graph, the percentiles and the counts of the last frame.
+        Returns the rects drawn on.
+        """
+        if not (self.enabled and self.visible and self.graph):
+            return []
+        if self.font is None:
+            self.font = pygame.font.Font(None, 20)
+            self.legend = [
+                self.font.render(phase, True, color, BLACK)
+                for phase, color in PHASE_COLORS.items()
+            ]
+        rects = [surface.blit(self.graph, (x, y))]
+        legend_x = x
+        for text in self.legend:
+            rects.append(
+                surface.blit(text, (legend_x, y + self.graph.get_height() + 52))
+            )
+            legend_x += text.get_width() + 6
+        times = list(self.history)
+        lines = [
+            f"frame ms p50 {percentile(times, 50):.1f}  "
+            f"p95 {percentile(times, 95):.1f}  p99 {percentile(times, 99):.1f}",
+            "  ".join(f"{name} {count}" for name, count in self.counts.items()),
+            "pools created/reused/free  "
+            + "  ".join(
+                "{} {created}/{reused}/{free}".format(name, **pool.stats())
+                for name, pool in self.pools.items()
+            ),
+        ]
+        for number, line in enumerate(lines):
+            text = self.font.render(line, True, WHITE, BLACK)
+            rects.append(
+                surface.blit(text, (x, y + self.graph.get_height() + 4 + 16 * number))
+            )
+        return rects
+
+    def summary(self):
+        """Returns frame time percentiles and per-phase mean and max as text."""
+        frames = len(self.frame_times)
+        lines = [
+            f"{frames} frames, frame ms p50 {percentile(self.frame_times, 50):.2f} "
+            f"p95 {percentile(self.frame_times, 95):.2f} "
+            f"p99 {percentile(self.frame_times, 99):.2f} "
+            f"max {max(self.frame_times, default=0):.2f}"
+        ]
+        for phase, total in self.phase_totals.items():
+            lines.append(
+                f"  {phase:<10} mean {total / max(frames, 1):.3f} ms, "
+                f"max {self.phase_max[phase]:.3f} ms"
+            )
+        for name, pool in self.pools.items():
+            lines.append(
+                "  {:<10} pool: {created} created, {reused} reused, "
+                "{dropped} dropped, {free} free".format(name, **pool.stats())
+            )
+        return "\n".join(lines)
+
+    def close(self):
+        """Closes the CSV trace and prints the summary."""
+        if self.file and not self.file.closed:
+            self.file.close()
+            print(self.summary())
+
+
+def percentile(values, pct):
+    """Computes a percentile with linear interpolation between samples."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+profiler = FrameProfiler()
+
+
+# Input Classes
+class KeyboardInput:
+    """Reads the real keyboard and window events."""
+
+    def events(self):
+        """Returns the events of this frame."""
+        return pygame.event.get()
+
+    def is_pressed(self, key):
+        """Checks whether a key is held down."""
+        return pygame.key.get_pressed()[key]
+
+
+class ScriptedInput:
+    """
+    Replays scripted key presses, one call to events() per simulation step. The
+    script repeats, so a short script can drive a run of any length.
+    """
+
+    def __init__(self, script, length):
+        self.script = script
+        self.length = length
+        self.frame = 0
+        self.held = set()
+
+    def events(self):
+        """Returns the key events scripted for this frame."""
+        events = []
+        for action, key in self.script.get(self.frame % self.length, []):
+            if action == "down":
+                self.held.add(key)
+                events.append(pygame.event.Event(pygame.KEYDOWN, key=key))
+            else:
+                self.held.discard(key)
+                events.append(pygame.event.Event(pygame.KEYUP, key=key))
+        self.frame += 1
+        return events
+
+    def is_pressed(self, key):
+        """Checks whether a key is held down."""
+        return key in self.held
+
+    @classmethod
+    def from_lines(cls, lines):
+        """
+        Parses a script with one "<frame> <down|up> <key name>" per line, e.g.
+        "30 down space". Empty lines and lines starting with # are ignored.
+        """
+        script = {}
+        length = 1
+        for line in lines:
+            line = line.split("#")[0].strip()
+            if not line:
+                continue
+            frame, action, name = line.split(None, 2)
+            if action not in ("down", "up"):
+                raise ValueError(f"Unknown action in script line: {line}")
+            script.setdefault(int(frame), []).append(
+                (action, pygame.key.key_code(name))
+            )
+            length = max(length, int(frame) + 1)
+        return cls(script, length)
+
+    @classmethod
+    def demo(cls):
+        """Walks right and left, shooting and jumping at regular intervals."""
+        lines = ["0 down right", "120 up right", "120 down left", "179 up left"]
+        lines += [f"{frame} down space" for frame in range(0, 180, 15)]
+        lines += [f"{frame + 1} up space" for frame in range(0, 180, 15)]
+        lines += ["60 down up", "61 up up", "150 down up", "151 up up"]
+        return cls.from_lines(lines)
+
+
+# Moving Sprite Class
+class MovingSprite(pygame.sprite.Sprite):
+    """
+    Sprite with a float position (x, y of its top-left corner) that moves in
+    fixed simulation steps. The rect is the rounded position, used for
+    collisions, and is placed between the previous and current positions
+    while the sprite is drawn.
+    """
+
+    def place(self, x, y):
+        """Moves the sprite to a position without interpolating from the last one."""
+        self.x = self.previous_x = x
+        self.y = self.previous_y = y
+        self.sync()
+
+    def begin_step(self):
+        """Remembers the position before a simulation step."""
+        self.previous_x, self.previous_y = self.x, self.y
+        self.sync()
+
+    def sync(self):
+        """Puts the rect on the simulated position."""
+        self.rect.x = round(self.x)
+        self.rect.y = round(self.y)
+
+    def interpolate(self, alpha):
+        """Puts the rect alpha of the way from the previous to the current position."""
+        self.rect.x = round(self.previous_x + (self.x - self.previous_x) * alpha)
+        self.rect.y = round(self.previous_y + (self.y - self.previous_y) * alpha)
 
 
 # Player Class
-class Player(pygame.sprite.Sprite):
+class Player(MovingSprite):
     """Represents the player in the game, allowing movement, jumping, and shooting."""
 
-    def __init__(self):
+    def __init__(self, controls=None):
         super().__init__()
-        self.image = player_image
+        self.controls = controls or KeyboardInput()
+        self.image = assets.image("player")
         self.rect = self.image.get_rect()
-        self.mask = pygame.mask.from_surface(
-            self.image
-        )  # Mask for pixel-perfect collision
-        self.rect.x = 100
-        self.rect.y = SCREEN_HEIGHT - self.rect.height - 10
+        self.mask = assets.mask("player")  # Mask for pixel-perfect collision
+        self.place(100, SCREEN_HEIGHT - self.rect.height - 10)
         self.speed = 5
         self.velocity_y = 0
         self.health = PLAYER_HEALTH
@@ -82,22 +571,22 @@ class Player(pygame.sprite.Sprite):
 
     def update(self):
         """Updates the player's position and handles movement logic."""
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT]:
-            self.rect.x -= self.speed
-        if keys[pygame.K_RIGHT]:
-            self.rect.x += self.speed
+        if self.controls.is_pressed(pygame.K_LEFT):
+            self.x -= self.speed
+        if self.controls.is_pressed(pygame.K_RIGHT):
+            self.x += self.speed
 
         # Handle jump
         if self.is_jumping:
-            self.rect.y += self.velocity_y
+            self.y += self.velocity_y
             self.velocity_y += GRAVITY
-            if self.rect.y >= SCREEN_HEIGHT - self.rect.height - 10:
-                self.rect.y = SCREEN_HEIGHT - self.rect.height - 10
+            if self.y >= SCREEN_HEIGHT - self.rect.height - 10:
+                self.y = SCREEN_HEIGHT - self.rect.height - 10
                 self.is_jumping = False
 
         # Keep player on screen
-        self.rect.x = max(0, min(self.rect.x, SCREEN_WIDTH - self.rect.width))
+        self.x = max(0, min(self.x, SCREEN_WIDTH - self.rect.width))
+        self.sync()
 
     def jump(self):
         """Initiates the jump action if the player is not already jumping."""
@@ -109,8 +598,7 @@ class Player(pygame.sprite.Sprite):
         """Creates a projectile and reduces ammo if available."""
         if self.ammo > 0:
             self.ammo -= 1
-            projectile = Projectile(self.rect.centerx, self.rect.centery)
-            return projectile
+            return projectile_pool.acquire(self.rect.centerx, self.rect.centery)
         return None
 
     def draw(self, surface):
@@ -118,47 +606,112 @@ class Player(pygame.sprite.Sprite):
         surface.blit(self.image, self.rect)
 
 
+# Sprite Pool Class
+class SpritePool:
+    """
+    Keeps killed sprites for reuse, so short-lived sprites like projectiles are
+    not allocated and garbage collected all the time. At most max_size free
+    sprites are kept; the rest are left to the garbage collector.
+    """
+
+    def __init__(self, sprite_class, max_size):
+        self.sprite_class = sprite_class
+        self.max_size = max_size
+        self.free = []
+        self.created = 0
+        self.reused = 0
+        self.dropped = 0
+
+    def acquire(self, *args):
+        """Returns a free sprite reset with args, or a new one."""
+        if self.free:
+            sprite = self.free.pop()
+            sprite.reset(*args)
+            self.reused += 1
+        else:
+            sprite = self.sprite_class(*args)
+            sprite.pool = self
+            self.created += 1
+        return sprite
+
+    def release(self, sprite):
+        """Takes back a killed sprite if the pool is not full."""
+        if len(self.free) < self.max_size:
+            self.free.append(sprite)
+        else:
+            self.dropped += 1
+
+    def stats(self):
+        """Returns how many sprites were created, reused, dropped and are free."""
+        return {
+            "created": self.created,
+            "reused": self.reused,
+            "dropped": self.dropped,
+            "free": len(self.free),
+        }
+
+
+# Pooled Sprite Class
+class PooledSprite(MovingSprite):
+    """Sprite that returns to its pool when killed."""
+
+    pool = None
+
+    def kill(self):
+        """Removes the sprite from all groups and releases it to its pool."""
+        if self.alive():
+            super().kill()
+            if self.pool:
+                self.pool.release(self)
+
+
 # Projectile Class
-class Projectile(pygame.sprite.Sprite):
+class Projectile(PooledSprite):
     """Represents a projectile shot by the player."""
 
     def __init__(self, x, y):
         super().__init__()
-        self.image = projectile_image
+        self.image = assets.image("projectile")
         self.rect = self.image.get_rect()
-        self.mask = pygame.mask.from_surface(
-            self.image
-        )  # Mask for pixel-perfect collision
-        self.rect.centerx = x
-        self.rect.centery = y
+        self.mask = assets.mask("projectile")  # Mask for pixel-perfect collision
         self.speed = 10
+        self.reset(x, y)
+
+    def reset(self, x, y):
+        """Places the projectile at the shooter's position."""
+        self.place(x - self.rect.width // 2, y - self.rect.height // 2)
 
     def update(self):
         """Moves the projectile across the screen."""
-        self.rect.x += self.speed
+        self.x += self.speed
+        self.sync()
         if self.rect.x > SCREEN_WIDTH:
             self.kill()
 
 
 # Boss Projectile Class
-class BossProjectile(pygame.sprite.Sprite):
+class BossProjectile(PooledSprite):
     """Represents a projectile shot by the boss."""
 
     def __init__(self, x, y, target_x, target_y):
         super().__init__()
-        self.image = boss_projectile_image
+        self.image = assets.image("boss_projectile")
         self.rect = self.image.get_rect()
-        self.mask = pygame.mask.from_surface(self.image)
-        self.rect.x = x
-        self.rect.y = y
-        direction_vector = pygame.math.Vector2(target_x - x, target_y - y).normalize()
-        self.speed_x = direction_vector.x * 7
-        self.speed_y = direction_vector.y * 7
+        self.mask = assets.mask("boss_projectile")
+        self.reset(x, y, target_x, target_y)
+
+    def reset(self, x, y, target_x, target_y):
+        """Places the projectile and aims it at the target."""
+        self.place(x, y)
+        distance = math.hypot(target_x - x, target_y - y)
+        self.speed_x = (target_x - x) / distance * 7
+        self.speed_y = (target_y - y) / distance * 7
 
     def update(self):
         """Moves the boss projectile toward the player's last known position."""
-        self.rect.x += self.speed_x
-        self.rect.y += self.speed_y
+        self.x += self.speed_x
+        self.y += self.speed_y
+        self.sync()
         if (
             self.rect.right < 0
             or self.rect.left > SCREEN_WIDTH
@@ -169,22 +722,22 @@ class BossProjectile(pygame.sprite.Sprite):
 
 
 # Enemy Class
-class Enemy(pygame.sprite.Sprite):
+class Enemy(MovingSprite):
     """Represents an enemy that moves toward the player."""
 
     def __init__(self, x):
         super().__init__()
-        self.image = enemy_image
+        self.image = assets.image("enemy")
         self.rect = self.image.get_rect()
-        self.mask = pygame.mask.from_surface(self.image)
-        self.rect.x = x
-        self.rect.y = SCREEN_HEIGHT - self.rect.height - 10
+        self.mask = assets.mask("enemy")
+        self.place(x, SCREEN_HEIGHT - self.rect.height - 10)
         self.speed = random.randint(1, 3)
         self.health = ENEMY_HEALTH
 
     def update(self):
         """Moves the enemy from right to left and removes it when it goes off-screen."""
-        self.rect.x -= self.speed
+        self.x -= self.speed
+        self.sync()
         if self.rect.right < 0:
             self.kill()
 
@@ -196,15 +749,15 @@ class Enemy(pygame.sprite.Sprite):
 
 
 # Boss Class
-class Boss(pygame.sprite.Sprite):
+class Boss(MovingSprite):
     """Represents the final boss with more complex behavior."""
 
     def __init__(self, x):
         super().__init__()
-        self.image = boss_image
+        self.image = assets.image("boss")
         self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.y = SCREEN_HEIGHT - self.rect.height - 10
+        self.mask = assets.mask("boss")
+        self.place(x, SCREEN_HEIGHT - self.rect.height - 10)
         self.health = BOSS_HEALTH
         self.jump_speed = 12
         self.velocity_y = 0
@@ -218,15 +771,16 @@ class Boss(pygame.sprite.Sprite):
             self.velocity_y = -self.jump_speed
 
         if self.is_jumping:
-            self.rect.y += self.velocity_y
+            self.y += self.velocity_y
             self.velocity_y += self.gravity
-            if self.rect.y >= SCREEN_HEIGHT - self.rect.height - 10:
-                self.rect.y = SCREEN_HEIGHT - self.rect.height - 10
+            if self.y >= SCREEN_HEIGHT - self.rect.height - 10:
+                self.y = SCREEN_HEIGHT - self.rect.height - 10
                 self.is_jumping = False
+        self.sync()
 
     def shoot(self, player):
         """Boss shoots projectiles aimed at the player's position."""
-        return BossProjectile(
+        return boss_projectile_pool.acquire(
             self.rect.left, self.rect.centery, player.rect.centerx, player.rect.centery
         )
 
@@ -236,421 +790,761 @@ class Boss(pygame.sprite.Sprite):
         if self.health <= 0:
             self.kill()
 
-    def draw_health_bar(self, surface):
-        """Draws the boss's health bar."""
-        bar_length = 150
-        bar_height = 15
-        fill = (self.health / BOSS_HEALTH) * bar_length
-        outline_rect = pygame.Rect(
-            self.rect.x + 15, self.rect.y - 25, bar_length, bar_height
-        )
-        fill_rect = pygame.Rect(self.rect.x + 15, self.rect.y - 25, fill, bar_height)
-        pygame.draw.rect(surface, RED, fill_rect)
-        pygame.draw.rect(surface, WHITE, outline_rect, 2)
-
 
 # Collectible Class
-class Collectible(pygame.sprite.Sprite):
+class Collectible(PooledSprite):
     """Represents a collectible item like ammo, health, or coins."""
 
     def __init__(self, kind):
         super().__init__()
-        self.kind = kind
-        if self.kind == "ammo":
-            self.image = ammo_image
-        elif self.kind == "health":
-            self.image = health_image
-        elif self.kind == "coin":
-            self.image = coin_image
+        self.reset(kind)
 
+    def reset(self, kind):
+        """Turns the collectible into the given kind and drops it from the top."""
+        self.kind = kind
+        self.image = assets.image(kind)
         self.rect = self.image.get_rect()
-        self.mask = pygame.mask.from_surface(
-            self.image
-        )  # Mask for pixel-perfect collision
-        self.rect.x = random.randint(0, SCREEN_WIDTH - self.rect.width)
-        self.rect.y = random.randint(-100, -40)
+        self.mask = assets.mask(kind)  # Mask for pixel-perfect collision
+        x = random.randint(0, SCREEN_WIDTH - self.rect.width)
+        self.place(x, random.randint(-100, -40))
         self.speed = random.randint(2, 5)
 
     def update(self):
         """Moves collectible downwards and removes it if it goes off-screen."""
-        self.rect.y += self.speed
+        self.y += self.speed
+        self.sync()
         if self.rect.top > SCREEN_HEIGHT:
             self.kill()
 
 
-# UI Drawing Functions
-def draw_health_bar(surface, x, y, pct):
-    """Draws a health bar at the given position."""
-    BAR_LENGTH = 100
-    BAR_HEIGHT = 10
-    fill = (pct / 100) * BAR_LENGTH
-    outline_rect = pygame.Rect(x, y, BAR_LENGTH, BAR_HEIGHT)
-    fill_rect = pygame.Rect(x, y, fill, BAR_HEIGHT)
-    pygame.draw.rect(surface, GREEN, fill_rect)
-    pygame.draw.rect(surface, WHITE, outline_rect, 2)
-
-
-def draw_lives(surface, x, y, lives):
-    """Displays the player's remaining lives on the screen."""
-    lives_text = font.render(f"Lives: {lives}", True, WHITE)
-    surface.blit(lives_text, (x, y))
-
-
-def draw_ammo(surface, x, y, ammo):
-    """Displays the player's remaining ammo on the screen."""
-    ammo_text = font.render(f"Ammo: {ammo}", True, WHITE)
-    surface.blit(ammo_text, (x, y))
-
-
-# Screen Display Functions for Level Completion, Game Over, and Boss Defeat
-def show_level_complete_screen(level):
-    """Displays a 'Level Complete' screen when the player finishes a level."""
-    screen.fill(BLACK)
-    level_complete_text = font.render(f"Level {level} Complete!", True, WHITE)
-    screen.blit(
-        level_complete_text,
-        (
-            (SCREEN_WIDTH // 2 - level_complete_text.get_width() // 2),
-            (SCREEN_HEIGHT // 2 - level_complete_text.get_height() // 2),
-        ),
-    )
-    pygame.display.flip()
-    pygame.time.wait(2000)
+# Object Pools
+projectile_pool = SpritePool(Projectile, PROJECTILE_POOL_SIZE)
+boss_projectile_pool = SpritePool(BossProjectile, BOSS_PROJECTILE_POOL_SIZE)
+collectible_pool = SpritePool(Collectible, COLLECTIBLE_POOL_SIZE)
+POOLS = {
+    "shots": projectile_pool,
+    "boss_shots": boss_projectile_pool,
+    "items": collectible_pool,
+}
+
+
+# HUD Class
+class HUD:
+    """
+    Draws the player's health, lives, ammo and score and the boss's health bar
+    from cached surfaces. A text or bar is only rendered again when its value
+    changes, and the menu and end screens share the text cache. invalidations
+    counts the renders, for profiling.
+    """
+
+    def __init__(self, max_texts=64):
+        self.max_texts = max_texts
+        self.texts = OrderedDict()
+        self.bars = {}
+        self.invalidations = 0
+
+    def text(self, string, color=WHITE):
+        """Returns the rendered text, from the cache if it was rendered before."""
+        key = (string, color)
+        if key in self.texts:
+            self.texts.move_to_end(key)
+        else:
+            self.texts[key] = font.render(string, True, color)
+            self.invalidations += 1
+            if len(self.texts) > self.max_texts:
+                self.texts.popitem(last=False)
+        return self.texts[key]
+
+    def bar(self, name, fraction, size, color):
+        """Returns a health bar filled to fraction, rendered when it changes."""
+        cached = self.bars.get(name)
+        if cached is None or cached[0] != (fraction, size, color):
+            surface = pygame.Surface(size, pygame.SRCALPHA)
+            fill_rect = pygame.Rect(0, 0, fraction * size[0], size[1])
+            pygame.draw.rect(surface, color, fill_rect)
+            pygame.draw.rect(surface, WHITE, surface.get_rect(), 2)
+            cached = ((fraction, size, color), surface)
+            self.bars[name] = cached
+            self.invalidations += 1
+        return cached[1]
+
+    def draw(self, surface, player, score, boss=None):
+        """Draws the HUD and returns the rects drawn on."""
+        health = self.bar("player", player.health / PLAYER_HEALTH, (100, 10), GREEN)
+        rects = [
+            surface.blit(health, (10, 10)),
+            surface.blit(self.text(f"Lives: {player.lives}"), (SCREEN_WIDTH - 150, 10)),
+            surface.blit(self.text(f"Ammo: {player.ammo}"), (SCREEN_WIDTH - 150, 40)),
+            surface.blit(self.text(f"Score: {score}"), (SCREEN_WIDTH - 150, 70)),
+        ]
+        if boss:
+            boss_health = self.bar("boss", boss.health / BOSS_HEALTH, (150, 15), RED)
+            rects.append(
+                surface.blit(boss_health, (boss.rect.x + 15, boss.rect.y - 25))
+            )
+        return rects
 
 
-def show_congratulations_screen(score):
-    """Displays a congratulation screen upon defeating the boss."""
-    screen.fill(BLACK)
-    congrats_text = font.render("Congratulations! You defeated the Boss!", True, WHITE)
-    screen.blit(
-        congrats_text,
-        (SCREEN_WIDTH // 2 - congrats_text.get_width() // 2, SCREEN_HEIGHT // 2 - 50),
-    )
-    leaderboard_text = font.render(f"Final Score: {score}", True, WHITE)
-    screen.blit(
-        leaderboard_text,
-        (SCREEN_WIDTH // 2 - leaderboard_text.get_width() // 2, SCREEN_HEIGHT // 2),
-    )
+hud = HUD()
 
-    # Buttons for retry and exit
-    retry_button_rect = pygame.Rect(
-        SCREEN_WIDTH // 2 - 75, SCREEN_HEIGHT // 2 + 60, 150, 50
-    )
-    exit_button_rect = pygame.Rect(
-        SCREEN_WIDTH // 2 - 75, SCREEN_HEIGHT // 2 + 120, 150, 50
-    )
-    pygame.draw.rect(screen, GREEN, retry_button_rect)
-    pygame.draw.rect(screen, RED, exit_button_rect)
-    retry_text = font.render("Retry", True, WHITE)
-    exit_text = font.render("Exit", True, WHITE)
-    screen.blit(retry_text, (retry_button_rect.x + 40, retry_button_rect.y + 10))
-    screen.blit(exit_text, (exit_button_rect.x + 50, exit_button_rect.y + 10))
-    pygame.display.flip()
-
-    waiting = True
-    while waiting:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                exit()
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                mouse_pos = pygame.mouse.get_pos()
-                if retry_button_rect.collidepoint(mouse_pos):
-                    waiting = False
-                    main()
-                elif exit_button_rect.collidepoint(mouse_pos):
-                    pygame.quit()
-                    exit()
-
-
-def show_game_over_screen(score):
-    """Displays the game over screen when the player loses all lives."""
-    screen.fill(BLACK)
-    game_over_text = font.render("Game Over! You lost all your lives.", True, WHITE)
-    screen.blit(
-        game_over_text,
-        (SCREEN_WIDTH // 2 - game_over_text.get_width() // 2, SCREEN_HEIGHT // 2 - 50),
-    )
-    leaderboard_text = font.render(f"Final Score: {score}", True, WHITE)
-    screen.blit(
-        leaderboard_text,
-        (SCREEN_WIDTH // 2 - leaderboard_text.get_width() // 2, SCREEN_HEIGHT // 2),
-    )
 
-    # Buttons for retry and exit
-    retry_button_rect = pygame.Rect(
-        SCREEN_WIDTH // 2 - 75, SCREEN_HEIGHT // 2 + 60, 150, 50
-    )
-    exit_button_rect = pygame.Rect(
-        SCREEN_WIDTH // 2 - 75, SCREEN_HEIGHT // 2 + 120, 150, 50
-    )
-    pygame.draw.rect(screen, GREEN, retry_button_rect)
-    pygame.draw.rect(screen, RED, exit_button_rect)
-    retry_text = font.render("Retry", True, WHITE)
-    exit_text = font.render("Exit", True, WHITE)
-    screen.blit(retry_text, (retry_button_rect.x + 40, retry_button_rect.y + 10))
-    screen.blit(exit_text, (exit_button_rect.x + 50, exit_button_rect.y + 10))
-    pygame.display.flip()
-
-    waiting = True
-    while waiting:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                exit()
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                mouse_pos = pygame.mouse.get_pos()
-                if retry_button_rect.collidepoint(mouse_pos):
-                    waiting = False
-                    main()
-                elif exit_button_rect.collidepoint(mouse_pos):
-                    pygame.quit()
-                    exit()
-
-
-# Pause screen function
-def pause_screen():
-    screen.fill(BLACK)
-    pause_text = font.render("Paused", True, WHITE)
-    resume_text = font.render("Press R to Resume or ESC to Exit", True, WHITE)
-
-    screen.blit(
-        pause_text,
-        (
-            (SCREEN_WIDTH // 2 - pause_text.get_width() // 2),
-            (SCREEN_HEIGHT // 2 - pause_text.get_height() // 2 - 30),
-        ),
-    )
-    screen.blit(
-        resume_text,
-        (
-            (SCREEN_WIDTH // 2 - resume_text.get_width() // 2),
-            (SCREEN_HEIGHT // 2 - resume_text.get_height() // 2 + 30),
-        ),
-    )
-    pygame.display.flip()
+# Scene Classes
+class Scene:
+    """
+    A screen of the game. The SceneManager calls frame() once per frame with
+    the milliseconds since the last one; scenes change the screen with
+    manager.switch() instead of running loops of their own.
+    """
 
-    paused = True
-    while paused:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                exit()
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_r:
-                    paused = False  # Resume the game
-                elif event.key == pygame.K_ESCAPE:
-                    pygame.quit()
-                    exit()
-        clock.tick(5)  # Limit the frame rate while paused
-
-
-# Instruction screen function
-def instruction_screen():
-    screen.fill(BLACK)
-    title_text = font.render("Welcome to the Shooting Game", True, WHITE)
-    instruction_text = font.render("Instructions:", True, WHITE)
-    movement_text = font.render("Move: LEFT and RIGHT Arrow Keys", True, WHITE)
-    jump_text = font.render("Jump: UP Arrow Key", True, WHITE)
-    shoot_text = font.render("Shoot: SPACE Key", True, WHITE)
-    pause_text = font.render("Pause: ESC Key", True, WHITE)
-    start_text = font.render("Press any key to start", True, GREEN)
-
-    # Displaying text on screen
-    screen.blit(title_text, ((SCREEN_WIDTH - title_text.get_width()) // 2, 100))
-    screen.blit(
-        instruction_text, ((SCREEN_WIDTH - instruction_text.get_width()) // 2, 200)
-    )
-    screen.blit(movement_text, ((SCREEN_WIDTH - movement_text.get_width()) // 2, 250))
-    screen.blit(jump_text, ((SCREEN_WIDTH - jump_text.get_width()) // 2, 300))
-    screen.blit(shoot_text, ((SCREEN_WIDTH - shoot_text.get_width()) // 2, 350))
-    screen.blit(pause_text, ((SCREEN_WIDTH - pause_text.get_width()) // 2, 400))
-    screen.blit(start_text, ((SCREEN_WIDTH - start_text.get_width()) // 2, 500))
+    def __init__(self, manager):
+        self.manager = manager
 
-    pygame.display.flip()
+    def enter(self):
+        """Called when the scene becomes the active one."""
 
-    waiting = True
-    while waiting:
-        for event in pygame.event.get():
+    def frame(self, frame_ms):
+        """Handles input, updates and draws the scene for one frame."""
+        raise NotImplementedError
+
+
+class MenuScene(Scene):
+    """Static screen, drawn once when entered, that waits for input."""
+
+    def enter(self):
+        screen.fill(BLACK)
+        self.draw(screen)
+        pygame.display.flip()
+
+    def frame(self, frame_ms):
+        for event in self.manager.controls.events():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                exit()
-            if event.type == pygame.KEYDOWN:
-                waiting = False  # Exit the loop when a key is pressed
+                self.manager.quit()
+            else:
+                self.handle_event(event)
 
+    def draw(self, surface):
+        """Draws the screen."""
 
-# Main Game Loop
-def main():
-    """Main game loop where player, enemies, and boss logic are handled."""
-
-    instruction_screen()
-
-    player = Player()
-    all_sprites = pygame.sprite.Group(player)
-    projectiles = pygame.sprite.Group()
-    enemies = pygame.sprite.Group()
-    collectibles = pygame.sprite.Group()
-    boss_projectiles = pygame.sprite.Group()
-
-    score = 0
-    defeated_enemies = 0
-    level = 1
-    boss = None
-    boss_fight = False
-    running = True
-    last_enemy_spawn_time = pygame.time.get_ticks()
-    last_collectible_spawn_time = pygame.time.get_ticks()
-
-    # Initialize the game with a few enemies
-    for _ in range(5):
-        enemy = Enemy(SCREEN_WIDTH + random.randint(100, 300))
-        all_sprites.add(enemy)
-        enemies.add(enemy)
+    def handle_event(self, event):
+        """Reacts to a key or mouse event."""
+
+
+# Instruction Scene
+class InstructionScene(MenuScene):
+    """Explains the controls; any key starts a game."""
+
+    def draw(self, surface):
+        lines = [
+            ("Welcome to the Shooting Game", WHITE, 100),
+            ("Instructions:", WHITE, 200),
+            ("Move: LEFT and RIGHT Arrow Keys", WHITE, 250),
+            ("Jump: UP Arrow Key", WHITE, 300),
+            ("Shoot: SPACE Key", WHITE, 350),
+            ("Pause: ESC Key", WHITE, 400),
+            ("Press any key to start", GREEN, 500),
+        ]
+        for line, color, y in lines:
+            text = hud.text(line, color)
+            surface.blit(text, ((SCREEN_WIDTH - text.get_width()) // 2, y))
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            self.manager.switch(PlayingScene(self.manager))
+
+
+# Pause Scene
+class PausedScene(MenuScene):
+    """Pauses a game; R resumes it and ESC exits."""
+
+    def __init__(self, manager, game):
+        super().__init__(manager)
+        self.game = game
+
+    def draw(self, surface):
+        pause_text = hud.text("Paused")
+        resume_text = hud.text("Press R to Resume or ESC to Exit")
+        surface.blit(
+            pause_text,
+            (
+                (SCREEN_WIDTH // 2 - pause_text.get_width() // 2),
+                (SCREEN_HEIGHT // 2 - pause_text.get_height() // 2 - 30),
+            ),
+        )
+        surface.blit(
+            resume_text,
+            (
+                (SCREEN_WIDTH // 2 - resume_text.get_width() // 2),
+                (SCREEN_HEIGHT // 2 - resume_text.get_height() // 2 + 30),
+            ),
+        )
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_r:
+                self.manager.switch(self.game)  # Resume the game
+            elif event.key == pygame.K_ESCAPE:
+                self.manager.quit()
 
-    while running:
-        clock.tick(FPS)
-        current_time = pygame.time.get_ticks()
 
-        for event in pygame.event.get():
+# Level Complete Scene
+class LevelCompleteScene(MenuScene):
+    """Shows that a level was finished for two seconds, then resumes the game."""
+
+    def __init__(self, manager, game, level):
+        super().__init__(manager)
+        self.game = game
+        self.level = level
+        self.remaining_ms = LEVEL_COMPLETE_MS
+
+    def draw(self, surface):
+        level_complete_text = hud.text(f"Level {self.level} Complete!")
+        surface.blit(
+            level_complete_text,
+            (
+                (SCREEN_WIDTH // 2 - level_complete_text.get_width() // 2),
+                (SCREEN_HEIGHT // 2 - level_complete_text.get_height() // 2),
+            ),
+        )
+
+    def frame(self, frame_ms):
+        super().frame(frame_ms)
+        self.remaining_ms -= frame_ms
+        if self.remaining_ms <= 0 and self.manager.scene is self:
+            self.manager.switch(self.game)
+
+
+# End Scenes for Game Over and Boss Defeat
+class EndScene(MenuScene):
+    """Shows the final score with buttons to retry or exit."""
+
+    message = ""
+
+    def __init__(self, manager, score):
+        super().__init__(manager)
+        self.score = score
+        self.retry_button_rect = pygame.Rect(
+            SCREEN_WIDTH // 2 - 75, SCREEN_HEIGHT // 2 + 60, 150, 50
+        )
+        self.exit_button_rect = pygame.Rect(
+            SCREEN_WIDTH // 2 - 75, SCREEN_HEIGHT // 2 + 120, 150, 50
+        )
+
+    def draw(self, surface):
+        message_text = hud.text(self.message)
+        surface.blit(
+            message_text,
+            (
+                SCREEN_WIDTH // 2 - message_text.get_width() // 2,
+                SCREEN_HEIGHT // 2 - 50,
+            ),
+        )
+        leaderboard_text = hud.text(f"Final Score: {self.score}")
+        surface.blit(
+            leaderboard_text,
+            (SCREEN_WIDTH // 2 - leaderboard_text.get_width() // 2, SCREEN_HEIGHT // 2),
+        )
+
+        # Buttons for retry and exit
+        pygame.draw.rect(surface, GREEN, self.retry_button_rect)
+        pygame.draw.rect(surface, RED, self.exit_button_rect)
+        surface.blit(
+            hud.text("Retry"),
+            (self.retry_button_rect.x + 40, self.retry_button_rect.y + 10),
+        )
+        surface.blit(
+            hud.text("Exit"),
+            (self.exit_button_rect.x + 50, self.exit_button_rect.y + 10),
+        )
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if self.retry_button_rect.collidepoint(event.pos):
+                self.manager.switch(PlayingScene(self.manager))
+            elif self.exit_button_rect.collidepoint(event.pos):
+                self.manager.quit()
+
+
+class GameOverScene(EndScene):
+    """Shown when the player loses all lives."""
+
+    message = "Game Over! You lost all your lives."
+
+
+class VictoryScene(EndScene):
+    """Shown when the boss is defeated."""
+
+    message = "Congratulations! You defeated the Boss!"
+
+
+# Playing Scene
+class PlayingScene(Scene):
+    """
+    One game, from the first enemy to game over or the boss's defeat. The game
+    is simulated in fixed steps of STEP_MS, however long the frames take to
+    draw; a slow frame is followed by several steps.
+    """
+
+    def __init__(self, manager):
+        super().__init__(manager)
+        self.player = Player(manager.controls)
+        self.all_sprites = pygame.sprite.RenderUpdates(self.player)
+        self.projectiles = pygame.sprite.Group()
+        self.enemies = pygame.sprite.Group()
+        self.collectibles = pygame.sprite.Group()
+        self.boss_projectiles = pygame.sprite.Group()
+        self.grid = SpatialHash()
+
+        self.score = 0
+        self.defeated_enemies = 0
+        self.level = 1
+        self.boss = None
+        self.boss_fight = False
+        self.frames = 0
+        self.steps = 0
+        self.accumulator = 0.0
+        self.current_time = 0.0
+        self.last_enemy_spawn_time = self.current_time
+        self.last_collectible_spawn_time = self.current_time
+
+        # Initialize the game with a few enemies
+        for _ in range(5):
+            self.spawn_enemy()
+
+    def enter(self):
+        renderer.reset()
+
+    def result(self, outcome):
+        """Returns frames played, final score and how the game ended."""
+        return {
+            "frames": self.frames,
+            "steps": self.steps,
+            "score": self.score,
+            "outcome": outcome,
+        }
+
+    def close(self):
+        """Kills the remaining sprites, so pooled ones go back to their pools."""
+        for sprite in self.all_sprites:
+            sprite.kill()
+
+    def spawn_enemy(self):
+        """Adds an enemy just behind the right edge of the screen."""
+        enemy = Enemy(SCREEN_WIDTH + random.randint(100, 300))
+        self.all_sprites.add(enemy)
+        self.enemies.add(enemy)
+
+    def frame(self, frame_ms):
+        self.frames += 1
+        self.accumulator += frame_ms
+        profiler.begin_frame()
+        while self.accumulator >= STEP_MS:
+            self.accumulator -= STEP_MS
+            self.step()
+            profiler.lap("boss")
+            if self.manager.scene is not self:
+                return
+        self.draw()
+
+    def lose_health(self, damage):
+        """Takes health from the player and ends the game on the last life."""
+        player = self.player
+        player.health -= damage
+        if player.health <= 0:
+            player.lives -= 1
+            if player.lives > 0:
+                player.health = PLAYER_HEALTH
+            else:
+                self.manager.end_game(self, "game_over")
+
+    def step(self):
+        """Simulates one step: input, movement, spawning and collisions."""
+        manager = self.manager
+        player = self.player
+        self.current_time += STEP_MS
+        self.steps += 1
+        for sprite in self.all_sprites:
+            sprite.begin_step()
+
+        for event in manager.controls.events():
             if event.type == pygame.QUIT:
-                running = False
+                manager.quit()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
                     projectile = player.shoot()
                     if projectile:
-                        all_sprites.add(projectile)
-                        projectiles.add(projectile)
+                        self.all_sprites.add(projectile)
+                        self.projectiles.add(projectile)
                 elif event.key == pygame.K_UP:
                     player.jump()
-                elif event.key == pygame.K_ESCAPE:
-                    pause_screen()
+                elif event.key == pygame.K_ESCAPE and not manager.headless:
+                    manager.switch(PausedScene(manager, self))
+                elif event.key == pygame.K_F3:
+                    profiler.visible = not profiler.visible
+        profiler.lap("events")
 
-        all_sprites.update()
+        self.all_sprites.update()
+        profiler.lap("update")
 
         # Enemy spawn logic
         if (
-            not boss_fight
-            and current_time - last_enemy_spawn_time > ENEMY_SPAWN_INTERVAL
-            and len(enemies) < MAX_ENEMIES
+            not self.boss_fight
+            and self.current_time - self.last_enemy_spawn_time > ENEMY_SPAWN_INTERVAL
+            and len(self.enemies) < MAX_ENEMIES
         ):
-            enemy = Enemy(SCREEN_WIDTH + random.randint(100, 300))
-            all_sprites.add(enemy)
-            enemies.add(enemy)
-            last_enemy_spawn_time = current_time
+            self.spawn_enemy()
+            self.last_enemy_spawn_time = self.current_time
 
         # Collectible spawn logic
-        if current_time - last_collectible_spawn_time > random.randint(3000, 5000):
+        if self.current_time - self.last_collectible_spawn_time > random.randint(
+            3000, 5000
+        ):
             kind = random.choice(["ammo", "health", "coin"])
-            collectible = Collectible(kind)
-            all_sprites.add(collectible)
-            collectibles.add(collectible)
-            last_collectible_spawn_time = current_time
+            collectible = collectible_pool.acquire(kind)
+            self.all_sprites.add(collectible)
+            self.collectibles.add(collectible)
+            self.last_collectible_spawn_time = self.current_time
+        profiler.lap("spawn")
+
+        # Only sprites sharing grid cells are tested for pixel-perfect collision
+        grid = self.grid
+        grid.rebuild(
+            self.enemies, self.projectiles, self.collectibles, self.boss_projectiles
+        )
 
         # Handle enemy collisions with player
-        for enemy in enemies:
-            if pygame.sprite.collide_mask(player, enemy):  # Pixel-perfect collision
-                player.health -= 20
-                enemy.kill()
-                if player.health <= 0:
-                    player.lives -= 1
-                    if player.lives > 0:
-                        player.health = PLAYER_HEALTH
-                    else:
-                        show_game_over_screen(score)
-                        return
+        for enemy in grid.collide(player, self.enemies):
+            enemy.kill()
+            self.lose_health(20)
+            if manager.scene is not self:
+                return
 
         # Handle projectile collisions with enemies
-        for projectile in projectiles:
-            enemy_hits = pygame.sprite.spritecollide(
-                projectile, enemies, False, pygame.sprite.collide_mask
-            )
+        for projectile in self.projectiles:
+            enemy_hits = grid.collide(projectile, self.enemies)
             if enemy_hits:
                 projectile.kill()
                 for enemy in enemy_hits:
                     enemy.take_damage(PROJECTILE_DAMAGE)
                     if enemy.health <= 0:
                         enemy.kill()
-                        score += 10
-                        defeated_enemies += 1
+                        self.score += 10
+                        self.defeated_enemies += 1
 
         # Handle collectible collisions with player
-        collectible_hits = pygame.sprite.spritecollide(
-            player, collectibles, True, pygame.sprite.collide_mask
-        )
+        collectible_hits = grid.collide(player, self.collectibles, dokill=True)
         for collectible in collectible_hits:
             if collectible.kind == "ammo":
                 player.ammo = min(player.ammo + 10, 40)
             elif collectible.kind == "health":
                 player.health = min(player.health + 20, PLAYER_HEALTH)
             elif collectible.kind == "coin":
-                score += 5
+                self.score += 5
 
         # Level progression logic
-        if defeated_enemies == LEVEL_SCORES[1] and level == 1:
-            show_level_complete_screen(level)
-            level += 1
-        elif defeated_enemies == LEVEL_SCORES[2] and level == 2:
-            show_level_complete_screen(level)
-            level += 1
+        if (
+            self.level < 3
+            and self.defeated_enemies == LEVEL_SCORES[self.level]
+            and not manager.headless
+        ):
+            manager.switch(LevelCompleteScene(manager, self, self.level))
+        if self.level < 3 and self.defeated_enemies == LEVEL_SCORES[self.level]:
+            self.level += 1
 
         # Boss fight initiation
-        if level == 3 and defeated_enemies >= LEVEL_SCORES[3] and not boss_fight:
-            boss = Boss(SCREEN_WIDTH - 200)
-            all_sprites.add(boss)
-            boss_fight = True
-            for enemy in enemies:
+        if (
+            self.level == 3
+            and self.defeated_enemies >= LEVEL_SCORES[3]
+            and not self.boss_fight
+        ):
+            self.boss = Boss(SCREEN_WIDTH - 200)
+            self.all_sprites.add(self.boss)
+            self.boss_fight = True
+            for enemy in self.enemies:
                 enemy.kill()
 
-        # Drawing
-        screen.blit(background_image, (0, 0))
-        all_sprites.draw(screen)
+        profiler.lap("collisions")
 
         # Boss behavior during fight
+        boss = self.boss
         if boss:
             boss.update()
             if random.random() < BOSS_SHOOT_PROBABILITY:
                 boss_projectile = boss.shoot(player)
-                all_sprites.add(boss_projectile)
-                boss_projectiles.add(boss_projectile)
+                self.all_sprites.add(boss_projectile)
+                self.boss_projectiles.add(boss_projectile)
+                grid.insert(boss_projectile)
 
             # Boss projectile collision with player
-            boss_projectile_hits = pygame.sprite.spritecollide(
-                player, boss_projectiles, True, pygame.sprite.collide_mask
-            )
-            if boss_projectile_hits:
-                player.health -= BOSS_PROJECTILE_DAMAGE
-                if player.health <= 0:
-                    player.lives -= 1
-                    if player.lives > 0:
-                        player.health = PLAYER_HEALTH
-                    else:
-                        show_game_over_screen(score)
-                        return
+            if grid.collide(player, self.boss_projectiles, dokill=True):
+                self.lose_health(BOSS_PROJECTILE_DAMAGE)
+                if manager.scene is not self:
+                    return
 
             # Player projectile collision with boss
-            boss_hits = pygame.sprite.spritecollide(
-                boss, projectiles, True, pygame.sprite.collide_rect
-            )
+            boss_hits = grid.collide(boss, self.projectiles, dokill=True)
             for projectile in boss_hits:
                 boss.take_damage(PROJECTILE_DAMAGE)
                 if boss.health <= 0:
-                    show_congratulations_screen(score)
+                    manager.end_game(self, "boss_defeated")
                     return
 
-            # Draw boss health bar
-            boss.draw_health_bar(screen)
+    def draw(self):
+        """Draws the sprites between their last two simulated positions."""
+        alpha = self.accumulator / STEP_MS
+        for sprite in self.all_sprites:
+            sprite.interpolate(alpha)
+        renderer.draw_sprites(self.all_sprites)
+        profiler.lap("draw")
+
+        # Draw player UI (health, lives, ammo, score) and the boss health bar
+        renderer.add(*hud.draw(screen, self.player, self.score, self.boss))
+        profiler.lap("hud")
+
+        renderer.add(*profiler.draw(screen))
+        profiler.lap("overlay")
+
+        renderer.present()
+        profiler.lap("flip")
+        profiler.end_frame(
+            {
+                "enemies": len(self.enemies),
+                "shots": len(self.projectiles),
+                "boss_shots": len(self.boss_projectiles),
+                "items": len(self.collectibles),
+                "sprites": len(self.all_sprites),
+                "pixels": renderer.pixels,
+                "hud_renders": hud.invalidations,
+            }
+        )
 
-        # Draw player UI (health, lives, ammo, score)
-        draw_health_bar(screen, 10, 10, player.health)
-        draw_lives(screen, SCREEN_WIDTH - 150, 10, player.lives)
-        draw_ammo(screen, SCREEN_WIDTH - 150, 40, player.ammo)
-        score_text = font.render(f"Score: {score}", True, WHITE)
-        screen.blit(score_text, (SCREEN_WIDTH - 150, 70))
 
-        pygame.display.flip()
+# Scene Manager Class
+class SceneManager:
+    """
+    Runs the game's only loop: every frame it ticks the clock and lets the
+    active scene handle it. Scenes replace each other with switch(), so a new
+    game after Retry does not nest calls or keep the last game alive. In
+    headless mode the instructions are skipped and the game cannot be paused;
+    with auto_restart a new game starts when one ends, without the end screen.
+    """
+
+    def __init__(
+        self, controls=None, game_clock=None, headless=False, auto_restart=False
+    ):
+        self.controls = controls or KeyboardInput()
+        self.game_clock = game_clock or GameClock(headless)
+        self.headless = headless
+        self.auto_restart = auto_restart
+        self.scene = None
+        self.running = False
+        self.results = []
+
+    def switch(self, scene):
+        """Makes scene the active scene."""
+        self.scene = scene
+        scene.enter()
+
+    def quit(self):
+        """Stops the loop after the current frame."""
+        self.running = False
+
+    def end_game(self, game, outcome):
+        """Records how a game ended and shows the end screen."""
+        self.results.append(game.result(outcome))
+        game.close()
+        if self.auto_restart:
+            self.switch(PlayingScene(self))
+        elif outcome == "boss_defeated":
+            self.switch(VictoryScene(self, game.score))
+        else:
+            self.switch(GameOverScene(self, game.score))
+
+    def run(self, max_frames=None, max_games=None):
+        """
+        Runs the loop until quit, or for at most max_frames frames or until
+        max_games more games have ended.
+        """
+        if self.scene is None:
+            first = PlayingScene(self) if self.headless else InstructionScene(self)
+            self.switch(first)
+        self.running = True
+        frames = 0
+        games = len(self.results)
+        while self.running:
+            if max_frames is not None and frames >= max_frames:
+                break
+            if max_games is not None and len(self.results) - games >= max_games:
+                break
+            frames += 1
+            self.scene.frame(min(self.game_clock.tick(FPS), MAX_FRAME_MS))
+
+
+# Main Game Loop
+def main():
+    """
+    Runs the game in the window, starting with the instructions. Opens the
+    window first if init_game() has not been called, e.g. when imported.
+    """
+    if pygame.display.get_surface() is None:
+        init_game()
+    SceneManager().run()
+    pygame.quit()
 
+
+# Headless simulation for soak tests and benchmarks
+def load_controls(script_path=None):
+    """Returns the scripted input of a headless run, the demo if no script is given."""
+    if script_path:
+        with open(script_path) as f:
+            return ScriptedInput.from_lines(f)
+    return ScriptedInput.demo()
+
+
+def run_headless(frames, seed=0, script_path=None, render_fps=FPS):
+    """
+    Steps the game for the given number of frames without a display, as fast as
+    the CPU allows. A new game starts whenever one ends. The random generator
+    is seeded and time is simulated, so a run always plays out the same way.
+    render_fps below FPS simulates slow rendering: each frame then takes
+    several simulation steps, and the game plays out the same per step.
+    """
+    random.seed(seed)
+    game_clock = GameClock(headless=True, frame_ms=1000 / render_fps)
+    manager = SceneManager(
+        load_controls(script_path), game_clock, headless=True, auto_restart=True
+    )
+
+    start = time.perf_counter()
+    manager.run(max_frames=frames)
+    elapsed = time.perf_counter() - start
+    results = manager.results + [manager.scene.result("frames")]
+
+    print(
+        f"Simulated {frames} frames in {elapsed:.2f} s "
+        f"({frames / elapsed if elapsed else 0:.0f} frames/s, seed {seed})"
+    )
+    if renderer.frames:
+        print(f"{renderer.total_pixels / renderer.frames:.0f} pixels pushed per frame")
+    for number, result in enumerate(results, 1):
+        print(
+            f"Game {number}: {result['outcome']} after {result['frames']} frames "
+            f"({result['steps']} steps), score {result['score']}"
+        )
+    pygame.quit()
+    return results
+
+
+def run_soak(restarts, seed=0, script_path=None):
+    """
+    Plays headless games back to back, each new one started by clicking Retry
+    on the end screen, and checks with tracemalloc that memory stays flat. The
+    first tenth of the games fills the caches and pools and is not counted.
+
+    Returns:
+        flat (bool): Whether memory grew by at most SOAK_MAX_GROWTH bytes per game.
+    """
+    random.seed(seed)
+    manager = SceneManager(load_controls(script_path), GameClock(True), headless=True)
+    warmup = max(1, restarts // 10)
+
+    tracemalloc.start()
+    samples = []
+    start = time.perf_counter()
+    for _ in range(restarts):
+        manager.run(max_games=1)
+        manager.results.clear()
+        retry = manager.scene.retry_button_rect.center
+        manager.scene.handle_event(
+            pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=retry, button=1)
+        )
+        gc.collect()
+        samples.append(tracemalloc.get_traced_memory()[0])
+    tracemalloc.stop()
+    elapsed = time.perf_counter() - start
+
+    growth = (samples[-1] - samples[warmup - 1]) / max(restarts - warmup, 1)
+    flat = growth <= SOAK_MAX_GROWTH
+    print(
+        f"Played {restarts} games in {elapsed:.1f} s; traced memory "
+        f"{samples[warmup - 1] / 1024:.0f} KB after {warmup} games, "
+        f"{samples[-1] / 1024:.0f} KB after {restarts} "
+        f"({growth:+.0f} bytes per game): {'flat' if flat else 'GROWING'}"
+    )
     pygame.quit()
+    return flat
+
+
+# Command line options
+def parse_args():
+    """Parses the command line options."""
+    parser = argparse.ArgumentParser(description="Shooting Game")
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Run without a display, uncapped, with scripted input",
+    )
+    parser.add_argument(
+        "--soak",
+        type=int,
+        metavar="GAMES",
+        help="Play this many headless games back to back and fail if memory grows",
+    )
+    parser.add_argument(
+        "--frames", type=int, default=3600, help="Frames to simulate when headless"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Random seed for the headless run"
+    )
+    parser.add_argument(
+        "--max-enemies",
+        type=int,
+        default=MAX_ENEMIES,
+        help="Enemies allowed at once (raise with --spawn-interval to stress test)",
+    )
+    parser.add_argument(
+        "--spawn-interval",
+        type=int,
+        default=ENEMY_SPAWN_INTERVAL,
+        help="Milliseconds between enemy spawns",
+    )
+    parser.add_argument(
+        "--dirty-rects",
+        action="store_true",
+        help="Redraw and update only the changed regions instead of the whole screen",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="frame_profile.csv",
+        metavar="CSV",
+        help="Time each phase of the game loop, show a graph (F3 toggles it) "
+        "and write a CSV trace on exit (default frame_profile.csv)",
+    )
+    parser.add_argument(
+        "--render-fps",
+        type=float,
+        default=FPS,
+        help="Frame rate simulated by the headless run; the game itself always "
+        f"runs at {FPS} steps per second",
+    )
+    parser.add_argument(
+        "--script",
+        help='Input script for the headless run, lines of "<frame> <down|up> <key>"',
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    MAX_ENEMIES = args.max_enemies
+    ENEMY_SPAWN_INTERVAL = args.spawn_interval
+    init_game(args.headless or bool(args.soak))
+    renderer.dirty_rects = args.dirty_rects
+    if args.profile:
+        profiler.start(args.profile, POOLS)
+    if args.soak:
+        sys.exit(0 if run_soak(args.soak, args.seed, args.script) else 1)
+    elif args.headless:
+        run_headless(args.frames, args.seed, args.script, args.render_fps)
+    else:
+        main()